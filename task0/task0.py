@@ -1,5 +1,80 @@
-def main(graph_string: str) -> list[list[bool]]:
+import mmap
+import os
+
+import numpy as np
+
+
+def build_sparse_adjacency(graph_string: str | tuple) -> dict:
+    """
+    Строит разреженную (CSR) матрицу смежности неориентированного графа
+
+    Номера вершин могут быть произвольными: если все они - целые числа в
+    канонической записи, вершины упорядочиваются по значению, иначе -
+    лексикографически. Имена вершин сохраняются как есть.
+
+    Возвращает:
+    Словарь с массивами CSR ("indptr", "indices"), массивом идентификаторов
+    вершин "vertices" и отображением "vertex_to_index"
+    """
+    if isinstance(graph_string, str):
+        edges = [edge.split(',') for edge in graph_string.strip().split('\n') if edge]
+        edge_keys = np.array(edges, dtype=str).reshape(-1, 2)
+    else:
+        # Результат read_edge_arrays: ключами служат имена вершин, рёбра уже закодированы
+        sources, targets, edge_keys = graph_string
+
+    vertex_keys, codes = np.unique(edge_keys, return_inverse=True)
+
+    # Числовые идентификаторы сортируем как числа, чтобы порядок совпадал с плотным режимом.
+    # Только если каждое имя - каноническая запись int64: иначе "01" и "1" слились бы в одну вершину
+    try:
+        vertex_numbers = vertex_keys.astype(np.int64)
+    except (ValueError, OverflowError):
+        vertex_numbers = None
+    if vertex_numbers is not None and np.array_equal(vertex_numbers.astype(str), vertex_keys):
+        order = np.argsort(vertex_numbers, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        vertex_keys, codes = vertex_keys[order], rank[codes]
+    if isinstance(graph_string, str):
+        codes = codes.reshape(-1, 2)
+    else:
+        codes = np.stack([codes[sources], codes[targets]], axis=1)
+    num_vertices = len(vertex_keys)
+
+    # Симметричные пары для неориентированного графа, без повторов
+    rows = np.concatenate([codes[:, 0], codes[:, 1]])
+    cols = np.concatenate([codes[:, 1], codes[:, 0]])
+    flat = np.unique(rows.astype(np.int64) * num_vertices + cols)
+    rows, cols = np.divmod(flat, num_vertices)
+
+    indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_vertices), out=indptr[1:])
+
+    vertices = vertex_keys.astype(str)
+    return {
+        "indptr": indptr,
+        "indices": cols,
+        "vertices": vertices,
+        "vertex_to_index": {vertex: idx for idx, vertex in enumerate(vertices.tolist())}
+    }
+
+
+def main(graph_string: str | tuple, sparse: bool = False) -> list[list[bool]] | dict:
     #Преобразует строковое представление графа в матрицу смежности
+    # В разреженном режиме возвращает CSR-представление (см. build_sparse_adjacency)
+    if sparse:
+        return build_sparse_adjacency(graph_string)
+
+    if not isinstance(graph_string, str):
+        # Результат read_edge_arrays: номера вершин берём из их имён
+        sources, targets, vertices = graph_string
+        vertex_numbers = vertices.astype(np.int64) - 1
+        adjacency_matrix = [[0] * len(vertices) for _ in range(len(vertices))]
+        for idx1, idx2 in zip(vertex_numbers[sources].tolist(), vertex_numbers[targets].tolist()):
+            adjacency_matrix[idx1][idx2] = 1
+            adjacency_matrix[idx2][idx1] = 1
+        return adjacency_matrix
 
     edges = graph_string.strip().split('\n')
 
@@ -39,6 +114,104 @@ def read_csv(file_path: str) -> str:
     return graph_data
 
 
+def split_edge_chunk(chunk: bytes) -> list[bytes]:
+    """
+    Разбивает блок CSV на имена вершин: по два поля на каждую непустую строку
+
+    Как и для строки графа: строки по '\n', поля по ',', имена вершин не изменяются.
+    Число полей проверяется для всего блока разом, а не построчно.
+    """
+    chunk = chunk.replace(b'\r', b'')
+    while b'\n\n' in chunk:
+        chunk = chunk.replace(b'\n\n', b'\n')
+    chunk = chunk.strip(b'\n')
+    if not chunk:
+        return []
+
+    # Разделители в корректном блоке чередуются: ',' '\n' ',' ... ','
+    chunk_bytes = np.frombuffer(chunk, dtype=np.uint8)
+    separator_positions = np.flatnonzero((chunk_bytes == ord(',')) | (chunk_bytes == ord('\n')))
+    separators = chunk_bytes[separator_positions]
+    mismatches = np.flatnonzero(separators != np.where(np.arange(len(separators)) % 2, ord('\n'), ord(',')))
+    if len(mismatches) or len(separators) % 2 == 0:
+        error_position = separator_positions[mismatches[0]] if len(mismatches) else len(chunk) - 1
+        line_start = chunk.rfind(b'\n', 0, error_position) + 1
+        line_end = chunk.find(b'\n', error_position)
+        line = chunk[line_start:line_end if line_end >= 0 else len(chunk)]
+        raise ValueError(f"Строка CSV должна содержать два поля: {line.decode('utf-8', 'replace')!r}")
+
+    return chunk.replace(b'\n', b',').split(b',')
+
+
+def unique_byte_names(names: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    То же, что np.unique(names, return_inverse=True), для массива байтовых строк
+
+    Имена дополняются нулями до длины, кратной 8, и сравниваются как беззнаковые
+    числа по 8 байт (старший байт первый): порядок тот же, что у строк, а числа
+    сортируются в несколько раз быстрее.
+    """
+    word_count = max(1, -(-names.itemsize // 8))
+    words = np.frombuffer(names.astype(f'S{8 * word_count}').tobytes(), dtype='>u8')
+    words = words.astype(np.uint64).reshape(len(names), word_count)
+    order = np.argsort(words[:, 0]) if word_count == 1 else np.lexsort(words.T[::-1])
+
+    sorted_words = words[order]
+    is_first = np.ones(len(names), dtype=bool)
+    is_first[1:] = (sorted_words[1:] != sorted_words[:-1]).any(axis=1)
+    inverse = np.empty(len(names), dtype=np.int64)
+    inverse[order] = np.cumsum(is_first) - 1
+    return names[order[is_first]], inverse
+
+
+def read_edge_arrays(file_path: str, chunk_size: int = 1 << 24) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Потоково читает CSV со списком рёбер через mmap, блоками по chunk_size байт
+
+    Возвращает:
+    Кортеж (sources, targets, vertices): целочисленные коды начала и конца
+    каждого ребра и отсортированный массив имён вершин
+    """
+    # Уникальные имена каждого блока и коды концов рёбер блока в его списке имён
+    name_chunks, code_chunks = [], []
+    name_count = 0
+
+    with open(file_path, 'rb') as csv_file:
+        file_size = os.fstat(csv_file.fileno()).st_size
+
+        if file_size:
+            with mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                chunk_start = 0
+                while chunk_start < file_size:
+                    # Блок заканчивается на границе строки
+                    chunk_end = min(chunk_start + chunk_size, file_size)
+                    if chunk_end < file_size:
+                        newline = mapped.rfind(b'\n', chunk_start, chunk_end)
+                        if newline < 0:
+                            newline = mapped.find(b'\n', chunk_end)
+                        chunk_end = newline + 1 if newline >= 0 else file_size
+
+                    tokens = split_edge_chunk(mapped[chunk_start:chunk_end])
+                    chunk_start = chunk_end
+                    if not tokens:
+                        continue
+
+                    chunk_vertices, inverse = unique_byte_names(np.array(tokens))
+                    name_chunks.append(chunk_vertices)
+                    code_chunks.append(inverse + name_count)
+                    name_count += len(chunk_vertices)
+
+    if not name_chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=str)
+
+    # Объединяем имена блоков и нумеруем вершины в порядке сортировки имён
+    # (порядок байтов UTF-8 совпадает с порядком строк)
+    sorted_names, rank = unique_byte_names(np.concatenate(name_chunks))
+    edge_codes = rank[np.concatenate(code_chunks)].reshape(-1, 2)
+
+    return edge_codes[:, 0], edge_codes[:, 1], np.char.decode(sorted_names, 'utf-8')
+
+
 def test1():
     """
     Тестирующая функция для проверки корректности работы main()
@@ -60,9 +233,40 @@ def test1():
     assert expected_adjacency_matrix == result_matrix, "Полученная матрица не соответствует ожидаемой!"
 
 
+def test2():
+    """
+    Проверяет, что разреженный режим main() совпадает с плотной матрицей смежности
+    и работает с нечисловыми идентификаторами вершин
+    """
+    graph_string = read_csv('data/task2.csv')
+
+    dense_matrix = main(graph_string)
+    sparse_result = main(graph_string, sparse=True)
+
+    indptr, indices = sparse_result["indptr"], sparse_result["indices"]
+    restored_matrix = [[0] * (len(indptr) - 1) for _ in range(len(indptr) - 1)]
+    for row in range(len(indptr) - 1):
+        for col in indices[indptr[row]:indptr[row + 1]]:
+            restored_matrix[row][col] = 1
+
+    assert dense_matrix == restored_matrix, "Разреженная матрица не соответствует плотной!"
+
+    named_result = main("a,b\nb,c\na,c", sparse=True)
+    assert named_result["vertex_to_index"] == {"a": 0, "b": 1, "c": 2}
+    assert named_result["indptr"].tolist() == [0, 2, 4, 6]
+
+    # Неканонические и не помещающиеся в int64 номера не сливаются и не ломают сортировку
+    assert main("01,1\n1,10", sparse=True)["vertices"].tolist() == ["01", "1", "10"]
+    assert main("99999999999999999999,2\n2,10", sparse=True)["vertices"].tolist() == ["10", "2", "99999999999999999999"]
+    assert main("10,2\n2,9", sparse=True)["vertices"].tolist() == ["2", "9", "10"]
+
+    assert main(read_edge_arrays('data/task2.csv')) == dense_matrix, "Потоковое чтение даёт другую матрицу!"
+
+
 if __name__ == "__main__":
     try:
         test1()
+        test2()
     except AssertionError:
         print("Тест не пройден")
     else:
@@ -1,3 +1,11 @@
+import hashlib
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+from multiprocessing import shared_memory
+
 import numpy as np
 
 
@@ -10,8 +18,196 @@ def read_csv(file_path: str) -> str:
     return graph_content
 
 
-def make_orient_adj_matrix(graph_string: str) -> np.ndarray[bool]:
+def split_edge_chunk(chunk: bytes) -> list[bytes]:
+    """
+    Разбивает блок CSV на имена вершин: по два поля на каждую непустую строку
+
+    Как и для строки графа: строки по '\n', поля по ',', имена вершин не изменяются.
+    Число полей проверяется для всего блока разом, а не построчно.
+    """
+    chunk = chunk.replace(b'\r', b'')
+    while b'\n\n' in chunk:
+        chunk = chunk.replace(b'\n\n', b'\n')
+    chunk = chunk.strip(b'\n')
+    if not chunk:
+        return []
+
+    # Разделители в корректном блоке чередуются: ',' '\n' ',' ... ','
+    chunk_bytes = np.frombuffer(chunk, dtype=np.uint8)
+    separator_positions = np.flatnonzero((chunk_bytes == ord(',')) | (chunk_bytes == ord('\n')))
+    separators = chunk_bytes[separator_positions]
+    mismatches = np.flatnonzero(separators != np.where(np.arange(len(separators)) % 2, ord('\n'), ord(',')))
+    if len(mismatches) or len(separators) % 2 == 0:
+        error_position = separator_positions[mismatches[0]] if len(mismatches) else len(chunk) - 1
+        line_start = chunk.rfind(b'\n', 0, error_position) + 1
+        line_end = chunk.find(b'\n', error_position)
+        line = chunk[line_start:line_end if line_end >= 0 else len(chunk)]
+        raise ValueError(f"Строка CSV должна содержать два поля: {line.decode('utf-8', 'replace')!r}")
+
+    return chunk.replace(b'\n', b',').split(b',')
+
+
+def unique_byte_names(names: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    То же, что np.unique(names, return_inverse=True), для массива байтовых строк
+
+    Имена дополняются нулями до длины, кратной 8, и сравниваются как беззнаковые
+    числа по 8 байт (старший байт первый): порядок тот же, что у строк, а числа
+    сортируются в несколько раз быстрее.
+    """
+    word_count = max(1, -(-names.itemsize // 8))
+    words = np.frombuffer(names.astype(f'S{8 * word_count}').tobytes(), dtype='>u8')
+    words = words.astype(np.uint64).reshape(len(names), word_count)
+    order = np.argsort(words[:, 0]) if word_count == 1 else np.lexsort(words.T[::-1])
+
+    sorted_words = words[order]
+    is_first = np.ones(len(names), dtype=bool)
+    is_first[1:] = (sorted_words[1:] != sorted_words[:-1]).any(axis=1)
+    inverse = np.empty(len(names), dtype=np.int64)
+    inverse[order] = np.cumsum(is_first) - 1
+    return names[order[is_first]], inverse
+
+
+def read_edge_arrays(file_path: str, chunk_size: int = 1 << 24) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Потоково читает CSV со списком рёбер через mmap, блоками по chunk_size байт
+
+    Возвращает:
+    Кортеж (sources, targets, vertices): целочисленные коды начала и конца
+    каждого ребра и отсортированный массив имён вершин
+    """
+    # Уникальные имена каждого блока и коды концов рёбер блока в его списке имён
+    name_chunks, code_chunks = [], []
+    name_count = 0
+
+    with open(file_path, 'rb') as csv_file:
+        file_size = os.fstat(csv_file.fileno()).st_size
+
+        if file_size:
+            with mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                chunk_start = 0
+                while chunk_start < file_size:
+                    # Блок заканчивается на границе строки
+                    chunk_end = min(chunk_start + chunk_size, file_size)
+                    if chunk_end < file_size:
+                        newline = mapped.rfind(b'\n', chunk_start, chunk_end)
+                        if newline < 0:
+                            newline = mapped.find(b'\n', chunk_end)
+                        chunk_end = newline + 1 if newline >= 0 else file_size
+
+                    tokens = split_edge_chunk(mapped[chunk_start:chunk_end])
+                    chunk_start = chunk_end
+                    if not tokens:
+                        continue
+
+                    chunk_vertices, inverse = unique_byte_names(np.array(tokens))
+                    name_chunks.append(chunk_vertices)
+                    code_chunks.append(inverse + name_count)
+                    name_count += len(chunk_vertices)
+
+    if not name_chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=str)
+
+    # Объединяем имена блоков и нумеруем вершины в порядке сортировки имён
+    # (порядок байтов UTF-8 совпадает с порядком строк)
+    sorted_names, rank = unique_byte_names(np.concatenate(name_chunks))
+    edge_codes = rank[np.concatenate(code_chunks)].reshape(-1, 2)
+
+    return edge_codes[:, 0], edge_codes[:, 1], np.char.decode(sorted_names, 'utf-8')
+
+
+def file_content_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """Хеш содержимого файла, служит ключом кэша графов"""
+    digest = hashlib.blake2b(digest_size=16)
+
+    with open(file_path, 'rb') as graph_file:
+        for block in iter(lambda: graph_file.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def evict_graph_cache(cache_dir: str, max_cache_bytes: int, keep_entry: str = None) -> None:
+    """Удаляет давно использованные записи кэша, пока его размер превышает max_cache_bytes"""
+    entries = []
+    for entry_name in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, entry_name)
+        if not os.path.isdir(entry_dir) or entry_name.startswith('.'):
+            continue
+        entry_size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+        entries.append((os.path.getmtime(entry_dir), entry_size, entry_dir))
+
+    total_size = sum(entry_size for _, entry_size, _ in entries)
+
+    # Сначала удаляем записи, к которым обращались раньше всех
+    for _, entry_size, entry_dir in sorted(entries):
+        if total_size <= max_cache_bytes:
+            break
+        if entry_dir == keep_entry:
+            continue
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total_size -= entry_size
+
+
+def load_graph_cached(file_path: str, cache_dir: str = None,
+                      max_cache_bytes: int = 1 << 30) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Загружает граф из двоичного кэша, при промахе разбирает CSV через read_edge_arrays
+
+    Запись кэша - каталог с файлами sources.npy, targets.npy и vertices.npy,
+    названный по хешу содержимого CSV. При попадании массивы отображаются
+    в память (mmap) без разбора текста.
+
+    Параметры:
+    file_path: путь к CSV со списком рёбер
+    cache_dir: каталог кэша (по умолчанию .graph_cache рядом с CSV)
+    max_cache_bytes: предельный размер кэша, лишние записи вытесняются по давности использования
+
+    Возвращает:
+    Кортеж (sources, targets, vertices) в формате read_edge_arrays
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), '.graph_cache')
+
+    entry_dir = os.path.join(cache_dir, file_content_hash(file_path))
+    array_names = ('sources', 'targets', 'vertices')
+
+    try:
+        graph = tuple(np.load(os.path.join(entry_dir, f'{name}.npy'), mmap_mode='r') for name in array_names)
+        # Отмечаем использование записи для вытеснения
+        os.utime(entry_dir)
+        return graph
+    except (FileNotFoundError, ValueError):
+        pass
+
+    graph = read_edge_arrays(file_path)
+
+    # Пишем во временный каталог и переименовываем, чтобы не оставить неполную запись
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix='.', dir=cache_dir)
+    for name, array in zip(array_names, graph):
+        np.save(os.path.join(temp_dir, f'{name}.npy'), array)
+
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    try:
+        os.replace(temp_dir, entry_dir)
+    except OSError:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    evict_graph_cache(cache_dir, max_cache_bytes, keep_entry=entry_dir)
+
+    return graph
+
+
+def make_orient_adj_matrix(graph_string: str | tuple) -> np.ndarray[bool]:
     #Создаёт матрицу смежности для ориентированного графа.
+    # Принимает строку CSV либо результат read_edge_arrays
+
+    if not isinstance(graph_string, str):
+        sources, targets, vertices = graph_string
+        adjacency_matrix = np.zeros((len(vertices), len(vertices)), dtype=bool)
+        adjacency_matrix[sources, targets] = True
+        return adjacency_matrix
 
     # Преобразуем строку в список ребер (кортежей вершин)
     edge_list: list[tuple[str, str]] = [tuple(edge.split(',')) for edge in graph_string.strip().split('\n') if edge]
@@ -48,42 +244,588 @@ def compute_r2(r1_matrix: np.ndarray[int]) -> np.ndarray[int]:
     return r1_matrix.T
 
 
-def compute_r3(adjacency_matrix: np.ndarray[bool]) -> np.ndarray[int]:
-    r3_matrix = adjacency_matrix.copy()
-
-    # Вычисляем транзитивное замыкание для путей длины до n-1
-    for _ in range(adjacency_matrix.shape[0] - 1):
-        # Используем матричное умножение с логическим ИЛИ для булевой алгебры
-        r3_matrix = r3_matrix | (r3_matrix @ adjacency_matrix)
-
-    r3_matrix = (r3_matrix & ~adjacency_matrix).astype(int)
-
-    return r3_matrix
+def find_strong_components(adjacency_matrix: np.ndarray[bool]) -> tuple[np.ndarray[int], int]:
+    """
+    Находит компоненты сильной связности (итеративный алгоритм Тарьяна)
+
+    Возвращает:
+    Номер компоненты для каждой вершины и число компонент. Компоненты
+    пронумерованы в обратном топологическом порядке: рёбра конденсации
+    ведут от компонент с большим номером к компонентам с меньшим.
+    """
+    num_vertices = adjacency_matrix.shape[0]
+    rows, cols = np.nonzero(adjacency_matrix)
+    row_starts = np.zeros(num_vertices + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_vertices), out=row_starts[1:])
+    row_starts, cols = row_starts.tolist(), cols.tolist()
+
+    order_index = [-1] * num_vertices
+    low_link = [0] * num_vertices
+    on_stack = [False] * num_vertices
+    component_labels = [-1] * num_vertices
+    vertex_stack = []
+    counter = 0
+    num_components = 0
+
+    for root in range(num_vertices):
+        if order_index[root] != -1:
+            continue
+
+        order_index[root] = low_link[root] = counter
+        counter += 1
+        vertex_stack.append(root)
+        on_stack[root] = True
+        # Стек обхода в глубину: (вершина, позиция следующего ребра)
+        work_stack = [(root, row_starts[root])]
+
+        while work_stack:
+            vertex, edge_pos = work_stack[-1]
+
+            if edge_pos < row_starts[vertex + 1]:
+                work_stack[-1] = (vertex, edge_pos + 1)
+                neighbour = cols[edge_pos]
+                if order_index[neighbour] == -1:
+                    order_index[neighbour] = low_link[neighbour] = counter
+                    counter += 1
+                    vertex_stack.append(neighbour)
+                    on_stack[neighbour] = True
+                    work_stack.append((neighbour, row_starts[neighbour]))
+                elif on_stack[neighbour]:
+                    low_link[vertex] = min(low_link[vertex], order_index[neighbour])
+                continue
+
+            work_stack.pop()
+            if work_stack:
+                parent = work_stack[-1][0]
+                low_link[parent] = min(low_link[parent], low_link[vertex])
+
+            # Вершина - корень компоненты: снимаем компоненту со стека
+            if low_link[vertex] == order_index[vertex]:
+                while True:
+                    member = vertex_stack.pop()
+                    on_stack[member] = False
+                    component_labels[member] = num_components
+                    if member == vertex:
+                        break
+                num_components += 1
+
+    return np.array(component_labels, dtype=np.int64), num_components
+
+
+def compute_closure_bits(adjacency_matrix: np.ndarray[bool]) -> np.ndarray[np.uint8]:
+    """
+    Вычисляет транзитивное замыкание (пути длины >= 1) через конденсацию графа
+
+    Компоненты сильной связности сжимаются в вершины DAG, достижимость
+    считается по нему в топологическом порядке на упакованных битовых строках.
+
+    Возвращает:
+    Матрицу n x ceil(n/8) из np.packbits: бит (i, j) установлен, если j достижима из i
+    """
+    num_vertices = adjacency_matrix.shape[0]
+    num_bytes = (num_vertices + 7) // 8
+    component_labels, num_components = find_strong_components(adjacency_matrix)
+
+    # Циклические компоненты (больше одной вершины или петля) достижимы сами из себя
+    component_sizes = np.bincount(component_labels, minlength=num_components)
+    is_cyclic = component_sizes > 1
+    is_cyclic[component_labels[np.diagonal(adjacency_matrix)]] = True
+
+    # closed_bits[c] = вершины компоненты c и всё, что из неё достижимо
+    closed_bits = np.zeros((num_components, num_bytes), dtype=np.uint8)
+    vertex_ids = np.arange(num_vertices)
+    np.bitwise_or.at(closed_bits, (component_labels, vertex_ids >> 3),
+                     (128 >> (vertex_ids & 7)).astype(np.uint8))
+
+    # Рёбра конденсации, сгруппированные по компоненте-источнику
+    rows, cols = np.nonzero(adjacency_matrix)
+    source_components, target_components = component_labels[rows], component_labels[cols]
+    between = source_components != target_components
+    condensed_edges = np.unique(source_components[between] * num_components + target_components[between])
+    source_components, target_components = np.divmod(condensed_edges, num_components)
+    successor_starts = np.searchsorted(source_components, np.arange(num_components + 1))
+
+    # Номера Тарьяна обратны топологическому порядку: преемники обработаны раньше
+    for component in range(num_components):
+        successors = target_components[successor_starts[component]:successor_starts[component + 1]]
+        if len(successors):
+            closed_bits[component] |= np.bitwise_or.reduce(closed_bits[successors], axis=0)
+
+    closure_bits = closed_bits[component_labels]
+
+    # Вершина ациклической компоненты не достижима сама из себя
+    acyclic_vertices = vertex_ids[~is_cyclic[component_labels]]
+    closure_bits[acyclic_vertices, acyclic_vertices >> 3] &= ~(128 >> (acyclic_vertices & 7)).astype(np.uint8)
+
+    return closure_bits
+
+
+# Размер матрицы, начиная с которого замыкание считается в нескольких процессах
+PARALLEL_CLOSURE_MIN_SIZE = 2048
+
+# Число затронутых строк замыкания (но не более n / 8), начиная с которого обход
+# по строкам дороже полного пересчёта compute_closure_bits (каждая строка - отдельный обход графа)
+INCREMENTAL_CLOSURE_MAX_ROWS = 32
+
+# Общая память, к которой подключается каждый рабочий процесс
+_closure_shared = {}
+
+
+def _attach_closure_matrix(shm_name: str, matrix_size: int) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _closure_shared["shm"] = shm
+    _closure_shared["matrix"] = np.ndarray((matrix_size, matrix_size), dtype=bool, buffer=shm.buf)
+
+
+def _update_closure_rows(task: tuple[int, int, int, int]) -> None:
+    # Фаза 3 блочного Флойда-Уоршелла для своей полосы строк:
+    # M[I, :] |= M[I, K] @ M[K, :], где строки K уже замкнуты по вершинам K
+    pivot_start, pivot_end, row_start, row_end = task
+    matrix = _closure_shared["matrix"]
+
+    through_pivot = matrix[row_start:row_end, pivot_start:pivot_end].astype(np.float32)
+    if through_pivot.any():
+        matrix[row_start:row_end] |= (through_pivot @ matrix[pivot_start:pivot_end].astype(np.float32)) > 0
+
+
+def parallel_transitive_closure(matrix: np.ndarray, workers: int = None,
+                                block_size: int = 256) -> np.ndarray[bool]:
+    """
+    Транзитивное замыкание (пути длины >= 1) блочным алгоритмом Флойда-Уоршелла
+    в пуле процессов
+
+    Матрица размещается в multiprocessing.shared_memory. Для каждого ведущего
+    блока K строки K замыкаются в основном процессе, после чего остальные
+    полосы строк обновляются рабочими процессами параллельно.
+
+    Параметры:
+    matrix: булева матрица смежности n x n
+    workers: число процессов (по умолчанию - число ядер)
+    block_size: размер ведущего блока
+
+    Возвращает:
+    Булеву матрицу достижимости
+    """
+    matrix_size = matrix.shape[0]
+    workers = workers or os.cpu_count() or 1
+    if matrix_size == 0:
+        return np.zeros((0, 0), dtype=bool)
+
+    shm = shared_memory.SharedMemory(create=True, size=matrix_size * matrix_size)
+    closure = pivot_rows = None
+    try:
+        closure = np.ndarray((matrix_size, matrix_size), dtype=bool, buffer=shm.buf)
+        closure[:] = matrix.astype(bool)
+
+        # Полосы строк для рабочих процессов, по несколько на процесс для балансировки
+        band_size = max(1, -(-matrix_size // (4 * workers)))
+        bands = [(start, min(start + band_size, matrix_size)) for start in range(0, matrix_size, band_size)]
+
+        with multiprocessing.Pool(workers, initializer=_attach_closure_matrix,
+                                  initargs=(shm.name, matrix_size)) as pool:
+            for pivot_start in range(0, matrix_size, block_size):
+                pivot_end = min(pivot_start + block_size, matrix_size)
+
+                # Фаза 1: замыкание диагонального блока возведением в квадрат
+                pivot_block = closure[pivot_start:pivot_end, pivot_start:pivot_end].copy()
+                while True:
+                    pivot_float = pivot_block.astype(np.float32)
+                    squared = pivot_block | ((pivot_float @ pivot_float) > 0)
+                    if (squared == pivot_block).all():
+                        break
+                    pivot_block = squared
+
+                # Фаза 2: строки K через вершины K
+                pivot_rows = closure[pivot_start:pivot_end]
+                pivot_rows |= (pivot_block.astype(np.float32) @ pivot_rows.astype(np.float32)) > 0
+
+                tasks = []
+                for band_start, band_end in bands:
+                    # Строки ведущего блока уже обработаны
+                    if band_start < pivot_start:
+                        tasks.append((pivot_start, pivot_end, band_start, min(band_end, pivot_start)))
+                    if band_end > pivot_end:
+                        tasks.append((pivot_start, pivot_end, max(band_start, pivot_end), band_end))
+
+                pool.map(_update_closure_rows, tasks)
+
+        result = closure.copy()
+    finally:
+        # Представления должны быть освобождены до закрытия общей памяти
+        closure = pivot_rows = None
+        shm.close()
+        shm.unlink()
+
+    return result
+
+
+def compute_r3(adjacency_matrix: np.ndarray[bool], sparse: bool = False,
+               block_size: int = 4096, workers: int = 1) -> np.ndarray[int]:
+    """
+    Матрица R3 (опосредованное управление): достижимость без прямых рёбер
+
+    При sparse=True возвращает массив пар (i, j) формы (k, 2) вместо матрицы n x n.
+    При workers != 1 (None - все ядра) замыкание больших графов считается
+    parallel_transitive_closure, для малых n остаётся последовательный алгоритм.
+    """
+    num_vertices = adjacency_matrix.shape[0]
+    if workers != 1 and num_vertices >= PARALLEL_CLOSURE_MIN_SIZE:
+        closure_bits = np.packbits(parallel_transitive_closure(adjacency_matrix, workers), axis=1)
+    else:
+        closure_bits = compute_closure_bits(adjacency_matrix)
+
+    r3_blocks = []
+    # Распаковываем замыкание блоками строк, чтобы не держать лишних копий n x n
+    for start in range(0, num_vertices, block_size):
+        end = min(start + block_size, num_vertices)
+        closure_block = np.unpackbits(closure_bits[start:end], axis=1, count=num_vertices).astype(bool)
+        r3_block = closure_block & ~adjacency_matrix[start:end]
+
+        if sparse:
+            pairs = np.argwhere(r3_block)
+            pairs[:, 0] += start
+            r3_blocks.append(pairs)
+        else:
+            r3_blocks.append(r3_block.astype(int))
+
+    if sparse:
+        return np.concatenate(r3_blocks) if r3_blocks else np.empty((0, 2), dtype=np.int64)
+
+    return np.concatenate(r3_blocks) if r3_blocks else np.zeros((0, 0), dtype=int)
 
 
 def compute_r4(r3_matrix: np.ndarray[int]) -> np.ndarray[int]:
     return r3_matrix.T
 
 
-def compute_r5(r2_matrix: np.ndarray[int]) -> np.ndarray[int]:
+def iter_r5_blocks(r2_bool: np.ndarray[bool], block_size: int = 2048):
+    """
+    Порождает блоки строк матрицы R5 как пары (номер первой строки, булев блок)
 
-    r2_bool = r2_matrix.copy().astype(bool)
+    Блок строк вычисляется как булево произведение R2 на R2^T по плиткам
+    block_size x block_size, так что промежуточная память не превышает O(block_size * n).
+    """
     matrix_size = r2_bool.shape[0]
-    r5_matrix = np.zeros((matrix_size, matrix_size), dtype=int)
-
-    # Проверяем каждую пару вершин на наличие общего родителя
-    for i in range(matrix_size):
-        for j in range(i + 1, matrix_size):
-            # Если есть хотя бы один общий элемент в строках (общий родитель)
-            if np.any(r2_bool[i] & r2_bool[j]):
-                r5_matrix[i, j], r5_matrix[j, i] = 1, 1  # Симметричная матрица
-    
-    return r5_matrix
+
+    for row_start in range(0, matrix_size, block_size):
+        row_end = min(row_start + block_size, matrix_size)
+        # float32 позволяет использовать BLAS; суммы до 2^24 представляются точно
+        row_parents = r2_bool[row_start:row_end].astype(np.float32)
+        r5_block = np.zeros((row_end - row_start, matrix_size), dtype=bool)
+
+        for col_start in range(0, matrix_size, block_size):
+            col_end = min(col_start + block_size, matrix_size)
+            col_parents = r2_bool[col_start:col_end].astype(np.float32)
+            r5_block[:, col_start:col_end] = (row_parents @ col_parents.T) > 0
+
+        # Вершина не соподчинена сама себе
+        block_rows = np.arange(row_end - row_start)
+        r5_block[block_rows, block_rows + row_start] = False
+
+        yield row_start, r5_block
 
 
-def main(graph_string: str, root_vertex: str) -> tuple[list[list[int]], list[list[int]], list[list[int]], list[list[int]], list[list[int]]]:
+def compute_r5(r2_matrix: np.ndarray[int], sparse: bool = False,
+               block_size: int = 2048) -> np.ndarray[int]:
+    """
+    Матрица R5 (соподчинение): вершины i != j имеют общего родителя
+
+    При sparse=True возвращает массив пар (i, j) формы (k, 2) вместо матрицы n x n.
+    """
+    r5_blocks = []
+
+    for row_start, r5_block in iter_r5_blocks(r2_matrix.astype(bool), block_size):
+        if sparse:
+            pairs = np.argwhere(r5_block)
+            pairs[:, 0] += row_start
+            r5_blocks.append(pairs)
+        else:
+            r5_blocks.append(r5_block.astype(int))
+
+    if sparse:
+        return np.concatenate(r5_blocks) if r5_blocks else np.empty((0, 2), dtype=np.int64)
+
+    return np.concatenate(r5_blocks) if r5_blocks else np.zeros((0, 0), dtype=int)
+
+
+# Число единичных битов для каждого значения байта
+POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+class RelationMatrices:
+    """
+    Ленивый набор отношений R1-R5 ориентированного графа
+
+    Отношения R1, R3 и R5 хранятся однократно в виде упакованных битовых
+    матриц (np.packbits) и вычисляются при первом обращении. R2 и R4
+    не хранятся: запросы к ним обслуживаются транспонированием R1 и R3.
+
+    Номера отношений k: 1 - прямое управление, 2 - прямое подчинение,
+    3 - опосредованное управление, 4 - опосредованное подчинение,
+    5 - соподчинение.
+    """
+
+    def __init__(self, adjacency_matrix: np.ndarray[bool], block_size: int = 2048):
+        self.adjacency_matrix = adjacency_matrix
+        self.num_vertices = adjacency_matrix.shape[0]
+        self.block_size = block_size
+        self._packed: dict[int, np.ndarray[np.uint8]] = {}
+
+    def packed(self, k: int) -> tuple[np.ndarray[np.uint8], bool]:
+        """
+        Возвращает упакованную базовую матрицу для отношения k
+        и признак того, что Rk - её транспонирование
+        """
+        if k not in (1, 2, 3, 4, 5):
+            raise ValueError(f"Неизвестное отношение R{k}")
+
+        base = {2: 1, 4: 3}.get(k, k)
+        if base not in self._packed:
+            self._packed[base] = self._compute(base)
+
+        return self._packed[base], base != k
+
+    def _compute(self, k: int) -> np.ndarray[np.uint8]:
+        if k == 1:
+            return np.packbits(self.adjacency_matrix, axis=1)
+
+        if k == 3:
+            return compute_closure_bits(self.adjacency_matrix) & ~self.packed(1)[0]
+
+        r5_bits = np.zeros_like(self.packed(1)[0])
+        for row_start, r5_block in iter_r5_blocks(self.adjacency_matrix.T, self.block_size):
+            r5_bits[row_start:row_start + len(r5_block)] = np.packbits(r5_block, axis=1)
+        return r5_bits
+
+    def _unpack_rows(self, bits: np.ndarray[np.uint8]) -> np.ndarray[bool]:
+        return np.unpackbits(bits, axis=-1, count=self.num_vertices).astype(bool)
+
+    def _unpack_column(self, bits: np.ndarray[np.uint8], column: int) -> np.ndarray[bool]:
+        return (bits[:, column >> 3] & (128 >> (column & 7))) != 0
+
+    def row(self, k: int, i: int) -> np.ndarray[bool]:
+        """Строка i отношения Rk"""
+        bits, transposed = self.packed(k)
+        return self._unpack_column(bits, i) if transposed else self._unpack_rows(bits[i])
+
+    def column(self, k: int, j: int) -> np.ndarray[bool]:
+        """Столбец j отношения Rk"""
+        bits, transposed = self.packed(k)
+        return self._unpack_rows(bits[j]) if transposed else self._unpack_column(bits, j)
+
+    def pair(self, k: int, i: int, j: int) -> bool:
+        """Проверяет, связаны ли вершины i и j отношением Rk"""
+        bits, transposed = self.packed(k)
+        if transposed:
+            i, j = j, i
+        return bool(bits[i, j >> 3] & (128 >> (j & 7)))
+
+    def out_degrees(self, k: int) -> np.ndarray[int]:
+        """Число единиц в каждой строке Rk"""
+        bits, transposed = self.packed(k)
+        if not transposed:
+            return POPCOUNT_TABLE[bits].sum(axis=1, dtype=np.int64)
+
+        # Для транспонированного отношения суммируем столбцы базовой матрицы по блокам строк
+        degrees = np.zeros(self.num_vertices, dtype=np.int64)
+        for start in range(0, self.num_vertices, self.block_size):
+            degrees += self._unpack_rows(bits[start:start + self.block_size]).sum(axis=0)
+        return degrees
+
+    def matrix(self, k: int) -> np.ndarray[bool]:
+        """Полная булева матрица Rk (для R2 и R4 - транспонированное представление)"""
+        bits, transposed = self.packed(k)
+        unpacked = self._unpack_rows(bits)
+        return unpacked.T if transposed else unpacked
+
+    def tolist(self) -> tuple[list[list[int]], ...]:
+        """Матрицы R1-R5 в формате результата main"""
+        return tuple(self.matrix(k).astype(int).tolist() for k in range(1, 6))
+
+
+class DynamicRelationGraph:
+    """
+    Ориентированный граф с инкрементным пересчётом отношений R1-R5
+
+    Хранит матрицу смежности, транзитивное замыкание (пути длины >= 1)
+    и матрицу числа общих родителей пар вершин. Добавление и удаление ребра
+    затрагивает только строки замыкания предков начала ребра и строки/столбцы
+    матрицы общих родителей для конца ребра; если предков больше
+    INCREMENTAL_CLOSURE_MAX_ROWS (или n / 8), замыкание после удаления пересчитывается целиком.
+
+    Вершины нумеруются как в make_orient_adj_matrix; новые вершины,
+    появляющиеся в add_edge, получают следующие свободные номера.
+    """
+
+    def __init__(self, graph_string: str | tuple = ''):
+        if isinstance(graph_string, str):
+            edge_list = [tuple(edge.split(',')) for edge in graph_string.strip().split('\n') if edge]
+            self.vertices = sorted({vertex for edge in edge_list for vertex in edge})
+        else:
+            self.vertices = list(graph_string[2].tolist())
+
+        self.vertex_to_index = {vertex: idx for idx, vertex in enumerate(self.vertices)}
+
+        if self.vertices:
+            self.adjacency_matrix = make_orient_adj_matrix(graph_string)
+        else:
+            self.adjacency_matrix = np.zeros((0, 0), dtype=bool)
+
+        num_vertices = len(self.vertices)
+        self.closure_matrix = np.unpackbits(
+            compute_closure_bits(self.adjacency_matrix), axis=1, count=num_vertices
+        ).astype(bool)
+
+        # shared_parents[i, j] - число общих родителей вершин i и j (R2 * R2^T)
+        adjacency_float = self.adjacency_matrix.astype(np.float32)
+        self.shared_parents = (adjacency_float.T @ adjacency_float).astype(np.int32)
+
+    def _vertex_index(self, vertex: str) -> int:
+        if vertex in self.vertex_to_index:
+            return self.vertex_to_index[vertex]
+
+        # Новая вершина: расширяем все матрицы на одну строку и столбец
+        self.vertex_to_index[vertex] = len(self.vertices)
+        self.vertices.append(vertex)
+        self.adjacency_matrix = np.pad(self.adjacency_matrix, (0, 1))
+        self.closure_matrix = np.pad(self.closure_matrix, (0, 1))
+        self.shared_parents = np.pad(self.shared_parents, (0, 1))
+
+        return self.vertex_to_index[vertex]
+
+    def add_edge(self, source_vertex: str, target_vertex: str) -> None:
+        """Добавляет ребро source_vertex -> target_vertex (повторное добавление ничего не меняет)"""
+        source, target = self._vertex_index(source_vertex), self._vertex_index(target_vertex)
+        if self.adjacency_matrix[source, target]:
+            return
+
+        # Новый родитель source становится общим для target и остальных его детей
+        children = self.adjacency_matrix[source]
+        self.shared_parents[target, children] += 1
+        self.shared_parents[children, target] += 1
+        self.shared_parents[target, target] += 1
+
+        self.adjacency_matrix[source, target] = True
+
+        # Всё, что достигало source (и сама source), теперь достигает target и его потомков
+        ancestors = self.closure_matrix[:, source].copy()
+        ancestors[source] = True
+        descendants = self.closure_matrix[target].copy()
+        descendants[target] = True
+        self.closure_matrix[ancestors] |= descendants
+
+    def remove_edge(self, source_vertex: str, target_vertex: str) -> None:
+        """Удаляет ребро source_vertex -> target_vertex"""
+        source = self.vertex_to_index.get(source_vertex)
+        target = self.vertex_to_index.get(target_vertex)
+        if source is None or target is None or not self.adjacency_matrix[source, target]:
+            raise KeyError(f"Ребро {source_vertex},{target_vertex} отсутствует в графе")
+
+        self.adjacency_matrix[source, target] = False
+
+        children = self.adjacency_matrix[source]
+        self.shared_parents[target, children] -= 1
+        self.shared_parents[children, target] -= 1
+        self.shared_parents[target, target] -= 1
+
+        # Удалённое ребро могли использовать только пути из предков source
+        affected = self.closure_matrix[:, source].copy()
+        affected[source] = True
+        affected_rows = np.flatnonzero(affected)
+
+        if len(affected_rows) > min(INCREMENTAL_CLOSURE_MAX_ROWS, len(self.vertices) // 8):
+            # Например, source в большой компоненте сильной связности: пересчёт целиком дешевле
+            self.closure_matrix = np.unpackbits(
+                compute_closure_bits(self.adjacency_matrix), axis=1, count=len(self.vertices)
+            ).astype(bool)
+            return
+
+        # Замыкания незатронутых вершин не меняются и не содержат затронутых вершин,
+        # поэтому обход продолжается только через затронутые вершины
+        new_rows = np.zeros((len(affected_rows), len(self.vertices)), dtype=bool)
+        for row_pos, vertex in enumerate(affected_rows):
+            reach = new_rows[row_pos]
+            frontier = self.adjacency_matrix[vertex].copy()
+            while frontier.any():
+                reach |= frontier
+                unaffected_new = frontier & ~affected
+                if unaffected_new.any():
+                    reach |= self.closure_matrix[unaffected_new].any(axis=0)
+                frontier = self.adjacency_matrix[frontier & affected].any(axis=0) & ~reach
+
+        self.closure_matrix[affected_rows] = new_rows
+
+    def row(self, k: int, i: int) -> np.ndarray[bool]:
+        """Строка i отношения Rk по текущему состоянию графа"""
+        if k == 1:
+            return self.adjacency_matrix[i].copy()
+        if k == 2:
+            return self.adjacency_matrix[:, i].copy()
+        if k == 3:
+            return self.closure_matrix[i] & ~self.adjacency_matrix[i]
+        if k == 4:
+            return self.closure_matrix[:, i] & ~self.adjacency_matrix[:, i]
+        if k == 5:
+            r5_row = self.shared_parents[i] > 0
+            r5_row[i] = False
+            return r5_row
+        raise ValueError(f"Неизвестное отношение R{k}")
+
+    def relations(self) -> RelationMatrices:
+        """Снимок отношений R1-R5 в виде RelationMatrices без повторного вычисления замыкания"""
+        relations = RelationMatrices(self.adjacency_matrix.copy())
+
+        r5_matrix = self.shared_parents > 0
+        np.fill_diagonal(r5_matrix, False)
+
+        relations._packed[1] = np.packbits(self.adjacency_matrix, axis=1)
+        relations._packed[3] = np.packbits(self.closure_matrix & ~self.adjacency_matrix, axis=1)
+        relations._packed[5] = np.packbits(r5_matrix, axis=1)
+
+        return relations
+
+
+def test1():
+    """
+    Проверяет, что DynamicRelationGraph после каждой вставки и удаления ребра
+    совпадает с отношениями, вычисленными main() заново
+
+    Удаления покрывают обе ветви remove_edge: пересчёт строк немногих предков
+    и полный пересчёт замыкания внутри большой компоненты сильной связности.
+    """
+    # Цепочка v00 -> ... -> v47 не удаляется, поэтому порядок вершин не меняется
+    edges = [(f"v{i:02d}", f"v{i + 1:02d}") for i in range(47)]
+    graph = DynamicRelationGraph('\n'.join(f"{v1},{v2}" for v1, v2 in edges))
+
+    operations = [
+        ("add", "v05", "v20"), ("add", "v30", "v10"), ("remove", "v05", "v20"),
+        ("add", "v47", "v00"), ("remove", "v30", "v10"), ("add", "v47", "w"),
+        ("remove", "v47", "v00"), ("add", "v02", "v40"), ("remove", "v02", "v03"),
+        ("add", "v02", "v03"), ("add", "v46", "v45"), ("remove", "v44", "v45"),
+    ]
+    for operation, v1, v2 in operations:
+        if operation == "add":
+            graph.add_edge(v1, v2)
+            edges.append((v1, v2))
+        else:
+            graph.remove_edge(v1, v2)
+            edges.remove((v1, v2))
+
+        expected_matrices = main('\n'.join(f"{v1},{v2}" for v1, v2 in edges), 'v00')
+        for k, expected_matrix in enumerate(expected_matrices, start=1):
+            for i, expected_row in enumerate(expected_matrix):
+                assert graph.row(k, i).astype(int).tolist() == expected_row, \
+                    f"R{k} расходится с пересчётом после {operation} {v1},{v2}!"
+
+
+def main(graph_string: str | tuple, root_vertex: str,
+         lazy: bool = False) -> tuple[list[list[int]], list[list[int]], list[list[int]], list[list[int]], list[list[int]]] | RelationMatrices:
     # Создаем матрицу смежности ориентированного графа
     adjacency_matrix = make_orient_adj_matrix(graph_string)
+
+    # В ленивом режиме матрицы вычисляются по запросу, без списков Python
+    if lazy:
+        return RelationMatrices(adjacency_matrix)
     
     # Вычисляем все матрицы отношений
     r1_matrix = compute_r1(adjacency_matrix)
@@ -103,6 +845,12 @@ def main(graph_string: str, root_vertex: str) -> tuple[list[list[int]], list[lis
 
 
 if __name__ == "__main__":
+    try:
+        test1()
+    except AssertionError:
+        print("Тест не пройден")
+    else:
+        print("Тест пройден успешно!")
 
     csv_file_path = 'data/task2.csv'
     
@@ -1,5 +1,17 @@
-import math
+import bisect
+import collections
 import itertools
+import json
+import math
+import hashlib
+import mmap
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from multiprocessing import shared_memory
 import numpy as np
 
 
@@ -11,6 +23,191 @@ def read_csv(path: str) -> str:
 
 
 
+def split_edge_chunk(chunk: bytes) -> list[bytes]:
+    """
+    Разбивает блок CSV на имена вершин: по два поля на каждую непустую строку
+
+    Как и для строки графа: строки по '\n', поля по ',', имена вершин не изменяются.
+    Число полей проверяется для всего блока разом, а не построчно.
+    """
+    chunk = chunk.replace(b'\r', b'')
+    while b'\n\n' in chunk:
+        chunk = chunk.replace(b'\n\n', b'\n')
+    chunk = chunk.strip(b'\n')
+    if not chunk:
+        return []
+
+    # Разделители в корректном блоке чередуются: ',' '\n' ',' ... ','
+    chunk_bytes = np.frombuffer(chunk, dtype=np.uint8)
+    separator_positions = np.flatnonzero((chunk_bytes == ord(',')) | (chunk_bytes == ord('\n')))
+    separators = chunk_bytes[separator_positions]
+    mismatches = np.flatnonzero(separators != np.where(np.arange(len(separators)) % 2, ord('\n'), ord(',')))
+    if len(mismatches) or len(separators) % 2 == 0:
+        error_position = separator_positions[mismatches[0]] if len(mismatches) else len(chunk) - 1
+        line_start = chunk.rfind(b'\n', 0, error_position) + 1
+        line_end = chunk.find(b'\n', error_position)
+        line = chunk[line_start:line_end if line_end >= 0 else len(chunk)]
+        raise ValueError(f"Строка CSV должна содержать два поля: {line.decode('utf-8', 'replace')!r}")
+
+    return chunk.replace(b'\n', b',').split(b',')
+
+
+def unique_byte_names(names: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    То же, что np.unique(names, return_inverse=True), для массива байтовых строк
+
+    Имена дополняются нулями до длины, кратной 8, и сравниваются как беззнаковые
+    числа по 8 байт (старший байт первый): порядок тот же, что у строк, а числа
+    сортируются в несколько раз быстрее.
+    """
+    word_count = max(1, -(-names.itemsize // 8))
+    words = np.frombuffer(names.astype(f'S{8 * word_count}').tobytes(), dtype='>u8')
+    words = words.astype(np.uint64).reshape(len(names), word_count)
+    order = np.argsort(words[:, 0]) if word_count == 1 else np.lexsort(words.T[::-1])
+
+    sorted_words = words[order]
+    is_first = np.ones(len(names), dtype=bool)
+    is_first[1:] = (sorted_words[1:] != sorted_words[:-1]).any(axis=1)
+    inverse = np.empty(len(names), dtype=np.int64)
+    inverse[order] = np.cumsum(is_first) - 1
+    return names[order[is_first]], inverse
+
+
+def read_edge_arrays(file_path: str, chunk_size: int = 1 << 24) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Потоково читает CSV со списком рёбер через mmap, блоками по chunk_size байт
+
+    Возвращает:
+    Кортеж (sources, targets, vertices): целочисленные коды начала и конца
+    каждого ребра и отсортированный массив имён вершин
+    """
+    # Уникальные имена каждого блока и коды концов рёбер блока в его списке имён
+    name_chunks, code_chunks = [], []
+    name_count = 0
+
+    with open(file_path, 'rb') as csv_file:
+        file_size = os.fstat(csv_file.fileno()).st_size
+
+        if file_size:
+            with mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                chunk_start = 0
+                while chunk_start < file_size:
+                    # Блок заканчивается на границе строки
+                    chunk_end = min(chunk_start + chunk_size, file_size)
+                    if chunk_end < file_size:
+                        newline = mapped.rfind(b'\n', chunk_start, chunk_end)
+                        if newline < 0:
+                            newline = mapped.find(b'\n', chunk_end)
+                        chunk_end = newline + 1 if newline >= 0 else file_size
+
+                    tokens = split_edge_chunk(mapped[chunk_start:chunk_end])
+                    chunk_start = chunk_end
+                    if not tokens:
+                        continue
+
+                    chunk_vertices, inverse = unique_byte_names(np.array(tokens))
+                    name_chunks.append(chunk_vertices)
+                    code_chunks.append(inverse + name_count)
+                    name_count += len(chunk_vertices)
+
+    if not name_chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=str)
+
+    # Объединяем имена блоков и нумеруем вершины в порядке сортировки имён
+    # (порядок байтов UTF-8 совпадает с порядком строк)
+    sorted_names, rank = unique_byte_names(np.concatenate(name_chunks))
+    edge_codes = rank[np.concatenate(code_chunks)].reshape(-1, 2)
+
+    return edge_codes[:, 0], edge_codes[:, 1], np.char.decode(sorted_names, 'utf-8')
+
+
+
+def file_content_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """Хеш содержимого файла, служит ключом кэша графов"""
+    digest = hashlib.blake2b(digest_size=16)
+
+    with open(file_path, 'rb') as graph_file:
+        for block in iter(lambda: graph_file.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+
+def evict_graph_cache(cache_dir: str, max_cache_bytes: int, keep_entry: str = None) -> None:
+    """Удаляет давно использованные записи кэша, пока его размер превышает max_cache_bytes"""
+    entries = []
+    for entry_name in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, entry_name)
+        if not os.path.isdir(entry_dir) or entry_name.startswith('.'):
+            continue
+        entry_size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+        entries.append((os.path.getmtime(entry_dir), entry_size, entry_dir))
+
+    total_size = sum(entry_size for _, entry_size, _ in entries)
+
+    # Сначала удаляем записи, к которым обращались раньше всех
+    for _, entry_size, entry_dir in sorted(entries):
+        if total_size <= max_cache_bytes:
+            break
+        if entry_dir == keep_entry:
+            continue
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total_size -= entry_size
+
+
+
+def load_graph_cached(file_path: str, cache_dir: str = None,
+                      max_cache_bytes: int = 1 << 30) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Загружает граф из двоичного кэша, при промахе разбирает CSV через read_edge_arrays
+
+    Запись кэша - каталог с файлами sources.npy, targets.npy и vertices.npy,
+    названный по хешу содержимого CSV. При попадании массивы отображаются
+    в память (mmap) без разбора текста.
+
+    Параметры:
+    file_path: путь к CSV со списком рёбер
+    cache_dir: каталог кэша (по умолчанию .graph_cache рядом с CSV)
+    max_cache_bytes: предельный размер кэша, лишние записи вытесняются по давности использования
+
+    Возвращает:
+    Кортеж (sources, targets, vertices) в формате read_edge_arrays
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), '.graph_cache')
+
+    entry_dir = os.path.join(cache_dir, file_content_hash(file_path))
+    array_names = ('sources', 'targets', 'vertices')
+
+    try:
+        graph = tuple(np.load(os.path.join(entry_dir, f'{name}.npy'), mmap_mode='r') for name in array_names)
+        # Отмечаем использование записи для вытеснения
+        os.utime(entry_dir)
+        return graph
+    except (FileNotFoundError, ValueError):
+        pass
+
+    graph = read_edge_arrays(file_path)
+
+    # Пишем во временный каталог и переименовываем, чтобы не оставить неполную запись
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix='.', dir=cache_dir)
+    for name, array in zip(array_names, graph):
+        np.save(os.path.join(temp_dir, f'{name}.npy'), array)
+
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    try:
+        os.replace(temp_dir, entry_dir)
+    except OSError:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    evict_graph_cache(cache_dir, max_cache_bytes, keep_entry=entry_dir)
+
+    return graph
+
+
+
 def compute_r1(adj_matr: np.ndarray) -> np.ndarray:
     return adj_matr.astype(int)
 
@@ -21,15 +218,260 @@ def compute_r2(r1: np.ndarray) -> np.ndarray:
 
 
 
-def compute_r3(adj_matr: np.ndarray) -> np.ndarray:
-    r3 = adj_matr.copy()
-    n = adj_matr.shape[0]
-    
-    for _ in range(n - 1):
-        r3 = r3 | (r3 @ adj_matr)
-    
-    r3 = (r3 & ~adj_matr).astype(int)
-    return r3
+def find_strong_components(adj_matr: np.ndarray) -> tuple[np.ndarray, int]:
+    """
+    Находит компоненты сильной связности (итеративный алгоритм Тарьяна)
+
+    Возвращает:
+    Номер компоненты для каждой вершины и число компонент. Компоненты
+    пронумерованы в обратном топологическом порядке: рёбра конденсации
+    ведут от компонент с большим номером к компонентам с меньшим.
+    """
+    num_vertices = adj_matr.shape[0]
+    rows, cols = np.nonzero(adj_matr)
+    row_starts = np.zeros(num_vertices + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_vertices), out=row_starts[1:])
+    row_starts, cols = row_starts.tolist(), cols.tolist()
+
+    order_index = [-1] * num_vertices
+    low_link = [0] * num_vertices
+    on_stack = [False] * num_vertices
+    component_labels = [-1] * num_vertices
+    vertex_stack = []
+    counter = 0
+    num_components = 0
+
+    for root in range(num_vertices):
+        if order_index[root] != -1:
+            continue
+
+        order_index[root] = low_link[root] = counter
+        counter += 1
+        vertex_stack.append(root)
+        on_stack[root] = True
+        # Стек обхода в глубину: (вершина, позиция следующего ребра)
+        work_stack = [(root, row_starts[root])]
+
+        while work_stack:
+            vertex, edge_pos = work_stack[-1]
+
+            if edge_pos < row_starts[vertex + 1]:
+                work_stack[-1] = (vertex, edge_pos + 1)
+                neighbour = cols[edge_pos]
+                if order_index[neighbour] == -1:
+                    order_index[neighbour] = low_link[neighbour] = counter
+                    counter += 1
+                    vertex_stack.append(neighbour)
+                    on_stack[neighbour] = True
+                    work_stack.append((neighbour, row_starts[neighbour]))
+                elif on_stack[neighbour]:
+                    low_link[vertex] = min(low_link[vertex], order_index[neighbour])
+                continue
+
+            work_stack.pop()
+            if work_stack:
+                parent = work_stack[-1][0]
+                low_link[parent] = min(low_link[parent], low_link[vertex])
+
+            # Вершина - корень компоненты: снимаем компоненту со стека
+            if low_link[vertex] == order_index[vertex]:
+                while True:
+                    member = vertex_stack.pop()
+                    on_stack[member] = False
+                    component_labels[member] = num_components
+                    if member == vertex:
+                        break
+                num_components += 1
+
+    return np.array(component_labels, dtype=np.int64), num_components
+
+
+
+def compute_closure_bits(adj_matr: np.ndarray) -> np.ndarray:
+    """
+    Вычисляет транзитивное замыкание (пути длины >= 1) через конденсацию графа
+
+    Компоненты сильной связности сжимаются в вершины DAG, достижимость
+    считается по нему в топологическом порядке на упакованных битовых строках.
+
+    Возвращает:
+    Матрицу n x ceil(n/8) из np.packbits: бит (i, j) установлен, если j достижима из i
+    """
+    num_vertices = adj_matr.shape[0]
+    num_bytes = (num_vertices + 7) // 8
+    component_labels, num_components = find_strong_components(adj_matr)
+
+    # Циклические компоненты (больше одной вершины или петля) достижимы сами из себя
+    component_sizes = np.bincount(component_labels, minlength=num_components)
+    is_cyclic = component_sizes > 1
+    is_cyclic[component_labels[np.diagonal(adj_matr)]] = True
+
+    # closed_bits[c] = вершины компоненты c и всё, что из неё достижимо
+    closed_bits = np.zeros((num_components, num_bytes), dtype=np.uint8)
+    vertex_ids = np.arange(num_vertices)
+    np.bitwise_or.at(closed_bits, (component_labels, vertex_ids >> 3),
+                     (128 >> (vertex_ids & 7)).astype(np.uint8))
+
+    # Рёбра конденсации, сгруппированные по компоненте-источнику
+    rows, cols = np.nonzero(adj_matr)
+    source_components, target_components = component_labels[rows], component_labels[cols]
+    between = source_components != target_components
+    condensed_edges = np.unique(source_components[between] * num_components + target_components[between])
+    source_components, target_components = np.divmod(condensed_edges, num_components)
+    successor_starts = np.searchsorted(source_components, np.arange(num_components + 1))
+
+    # Номера Тарьяна обратны топологическому порядку: преемники обработаны раньше
+    for component in range(num_components):
+        successors = target_components[successor_starts[component]:successor_starts[component + 1]]
+        if len(successors):
+            closed_bits[component] |= np.bitwise_or.reduce(closed_bits[successors], axis=0)
+
+    closure_bits = closed_bits[component_labels]
+
+    # Вершина ациклической компоненты не достижима сама из себя
+    acyclic_vertices = vertex_ids[~is_cyclic[component_labels]]
+    closure_bits[acyclic_vertices, acyclic_vertices >> 3] &= ~(128 >> (acyclic_vertices & 7)).astype(np.uint8)
+
+    return closure_bits
+
+
+
+# Размер матрицы, начиная с которого замыкание считается в нескольких процессах
+PARALLEL_CLOSURE_MIN_SIZE = 2048
+
+# Число затронутых строк замыкания (но не более n / 8), начиная с которого обход
+# по строкам дороже полного пересчёта compute_closure_bits (каждая строка - отдельный обход графа)
+INCREMENTAL_CLOSURE_MAX_ROWS = 32
+
+# Общая память, к которой подключается каждый рабочий процесс
+_closure_shared = {}
+
+
+
+def _attach_closure_matrix(shm_name: str, matrix_size: int) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _closure_shared["shm"] = shm
+    _closure_shared["matrix"] = np.ndarray((matrix_size, matrix_size), dtype=bool, buffer=shm.buf)
+
+
+
+def _update_closure_rows(task: tuple[int, int, int, int]) -> None:
+    # Фаза 3 блочного Флойда-Уоршелла для своей полосы строк:
+    # M[I, :] |= M[I, K] @ M[K, :], где строки K уже замкнуты по вершинам K
+    pivot_start, pivot_end, row_start, row_end = task
+    matrix = _closure_shared["matrix"]
+
+    through_pivot = matrix[row_start:row_end, pivot_start:pivot_end].astype(np.float32)
+    if through_pivot.any():
+        matrix[row_start:row_end] |= (through_pivot @ matrix[pivot_start:pivot_end].astype(np.float32)) > 0
+
+
+
+def parallel_transitive_closure(matrix: np.ndarray, workers: int = None,
+                                block_size: int = 256) -> np.ndarray[bool]:
+    """
+    Транзитивное замыкание (пути длины >= 1) блочным алгоритмом Флойда-Уоршелла
+    в пуле процессов
+
+    Матрица размещается в multiprocessing.shared_memory. Для каждого ведущего
+    блока K строки K замыкаются в основном процессе, после чего остальные
+    полосы строк обновляются рабочими процессами параллельно.
+
+    Параметры:
+    matrix: булева матрица смежности n x n
+    workers: число процессов (по умолчанию - число ядер)
+    block_size: размер ведущего блока
+
+    Возвращает:
+    Булеву матрицу достижимости
+    """
+    matrix_size = matrix.shape[0]
+    workers = workers or os.cpu_count() or 1
+    if matrix_size == 0:
+        return np.zeros((0, 0), dtype=bool)
+
+    shm = shared_memory.SharedMemory(create=True, size=matrix_size * matrix_size)
+    closure = pivot_rows = None
+    try:
+        closure = np.ndarray((matrix_size, matrix_size), dtype=bool, buffer=shm.buf)
+        closure[:] = matrix.astype(bool)
+
+        # Полосы строк для рабочих процессов, по несколько на процесс для балансировки
+        band_size = max(1, -(-matrix_size // (4 * workers)))
+        bands = [(start, min(start + band_size, matrix_size)) for start in range(0, matrix_size, band_size)]
+
+        with multiprocessing.Pool(workers, initializer=_attach_closure_matrix,
+                                  initargs=(shm.name, matrix_size)) as pool:
+            for pivot_start in range(0, matrix_size, block_size):
+                pivot_end = min(pivot_start + block_size, matrix_size)
+
+                # Фаза 1: замыкание диагонального блока возведением в квадрат
+                pivot_block = closure[pivot_start:pivot_end, pivot_start:pivot_end].copy()
+                while True:
+                    pivot_float = pivot_block.astype(np.float32)
+                    squared = pivot_block | ((pivot_float @ pivot_float) > 0)
+                    if (squared == pivot_block).all():
+                        break
+                    pivot_block = squared
+
+                # Фаза 2: строки K через вершины K
+                pivot_rows = closure[pivot_start:pivot_end]
+                pivot_rows |= (pivot_block.astype(np.float32) @ pivot_rows.astype(np.float32)) > 0
+
+                tasks = []
+                for band_start, band_end in bands:
+                    # Строки ведущего блока уже обработаны
+                    if band_start < pivot_start:
+                        tasks.append((pivot_start, pivot_end, band_start, min(band_end, pivot_start)))
+                    if band_end > pivot_end:
+                        tasks.append((pivot_start, pivot_end, max(band_start, pivot_end), band_end))
+
+                pool.map(_update_closure_rows, tasks)
+
+        result = closure.copy()
+    finally:
+        # Представления должны быть освобождены до закрытия общей памяти
+        closure = pivot_rows = None
+        shm.close()
+        shm.unlink()
+
+    return result
+
+
+
+def compute_r3(adj_matr: np.ndarray, sparse: bool = False,
+               block_size: int = 4096, workers: int = 1) -> np.ndarray:
+    """
+    Матрица R3 (опосредованное управление): достижимость без прямых рёбер
+
+    При sparse=True возвращает массив пар (i, j) формы (k, 2) вместо матрицы n x n.
+    При workers != 1 (None - все ядра) замыкание больших графов считается
+    parallel_transitive_closure, для малых n остаётся последовательный алгоритм.
+    """
+    num_vertices = adj_matr.shape[0]
+    if workers != 1 and num_vertices >= PARALLEL_CLOSURE_MIN_SIZE:
+        closure_bits = np.packbits(parallel_transitive_closure(adj_matr, workers), axis=1)
+    else:
+        closure_bits = compute_closure_bits(adj_matr)
+
+    r3_blocks = []
+    # Распаковываем замыкание блоками строк, чтобы не держать лишних копий n x n
+    for start in range(0, num_vertices, block_size):
+        end = min(start + block_size, num_vertices)
+        closure_block = np.unpackbits(closure_bits[start:end], axis=1, count=num_vertices).astype(bool)
+        r3_block = closure_block & ~adj_matr[start:end]
+
+        if sparse:
+            pairs = np.argwhere(r3_block)
+            pairs[:, 0] += start
+            r3_blocks.append(pairs)
+        else:
+            r3_blocks.append(r3_block.astype(int))
+
+    if sparse:
+        return np.concatenate(r3_blocks) if r3_blocks else np.empty((0, 2), dtype=np.int64)
+
+    return np.concatenate(r3_blocks) if r3_blocks else np.zeros((0, 0), dtype=int)
 
 
 
@@ -38,18 +480,45 @@ def compute_r4(r3: np.ndarray) -> np.ndarray:
 
 
 
-def compute_r5(r2: np.ndarray) -> np.ndarray:
+def compute_r5(r2: np.ndarray, sparse: bool = False,
+               block_size: int = 2048) -> np.ndarray:
+    """
+    Матрица R5 (соподчинение): вершины i != j имеют общего родителя
+
+    Вычисляется как булево произведение R2 на R2^T по блокам block_size x block_size,
+    так что промежуточная память не превышает O(block_size * n).
+    При sparse=True возвращает массив пар (i, j) формы (k, 2) вместо матрицы n x n.
+    """
     r2_bool = r2.astype(bool)
-    n = r2.shape[0]
-    r5 = np.zeros((n, n), dtype=int)
-    
-    for i in range(n):
-        for j in range(i + 1, n):
-            if np.any(r2_bool[i] & r2_bool[j]):
-                r5[i, j] = 1
-                r5[j, i] = 1
-    return r5
+    n = r2_bool.shape[0]
+    r5_blocks = []
+
+    for row_start in range(0, n, block_size):
+        row_end = min(row_start + block_size, n)
+        # float32 позволяет использовать BLAS; суммы до 2^24 представляются точно
+        row_parents = r2_bool[row_start:row_end].astype(np.float32)
+        r5_block = np.zeros((row_end - row_start, n), dtype=bool)
+
+        for col_start in range(0, n, block_size):
+            col_end = min(col_start + block_size, n)
+            col_parents = r2_bool[col_start:col_end].astype(np.float32)
+            r5_block[:, col_start:col_end] = (row_parents @ col_parents.T) > 0
 
+        # Вершина не соподчинена сама себе
+        block_rows = np.arange(row_end - row_start)
+        r5_block[block_rows, block_rows + row_start] = False
+
+        if sparse:
+            pairs = np.argwhere(r5_block)
+            pairs[:, 0] += row_start
+            r5_blocks.append(pairs)
+        else:
+            r5_blocks.append(r5_block.astype(int))
+
+    if sparse:
+        return np.concatenate(r5_blocks) if r5_blocks else np.empty((0, 2), dtype=np.int64)
+
+    return np.concatenate(r5_blocks) if r5_blocks else np.zeros((0, 0), dtype=int)
 
 
 def calculate_entropy(perm_edges, vert_index) -> tuple[float, float]:
@@ -60,79 +529,785 @@ def calculate_entropy(perm_edges, vert_index) -> tuple[float, float]:
         j = vert_index[v2]
         adj[i, j] = True
 
-    r1 = compute_r1(adj)
-    r2 = compute_r2(r1)
-    r3 = compute_r3(adj)
-    r4 = compute_r4(r3)
-    r5 = compute_r5(r2)
-    r_union = [r1, r2, r3, r4, r5]
+    H, h = calculate_entropy_batch(adj[np.newaxis])
 
-    n = r_union[0].shape[0]
-    total_entropy = 0.0
-    
-    for matrix in r_union:
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    p_ij = matrix[i, j] / (n - 1)
-                    if p_ij > 0:
-                        total_entropy += p_ij * math.log2(p_ij)
-    
-    H = -total_entropy
-    H_max = (1 / math.e) * n * len(r_union)
+    return float(H[0]), float(h[0])
+
+
+def calculate_entropy_batch(adj_batch: np.ndarray,
+                            memory_budget: int = 256 * 2**20) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Векторная оценка энтропии для пакета графов
+
+    Матрицы отношений содержат только 0 и 1, поэтому энтропия сводится к подсчёту
+    единиц вне диагонали (см. entropy_from_ones). Замыкание считается возведением
+    в квадрат, R5 - произведением R2 на R2^T для всего пакета сразу.
+
+    Параметры:
+    adj_batch: булев тензор (batch, n, n) матриц смежности
+    memory_budget: ограничение памяти на промежуточные массивы, байт
+
+    Возвращает:
+    Массивы H(M, R) и h(M, R) длины batch
+    """
+    batch_size, n = adj_batch.shape[0], adj_batch.shape[1]
+    off_diagonal = ~np.eye(n, dtype=bool)
+    ones_counts = np.zeros(batch_size, dtype=np.int64)
+
+    # На граф приходится около 16 байт на ячейку: булевы и float32 копии и произведения
+    chunk_size = max(1, memory_budget // max(1, 16 * n * n))
+
+    for start in range(0, batch_size, chunk_size):
+        adj = adj_batch[start:start + chunk_size].astype(bool)
+        adj_float = adj.astype(np.float32)
+
+        # Транзитивное замыкание (пути длины >= 1): M = M | M*M до сходимости
+        closure = adj
+        while True:
+            closure_float = closure.astype(np.float32)
+            squared = closure | ((closure_float @ closure_float) > 0)
+            if (squared == closure).all():
+                break
+            closure = squared
+
+        r5 = (adj_float.transpose(0, 2, 1) @ adj_float) > 0
+
+        r1_counts = (adj & off_diagonal).sum(axis=(1, 2))
+        r3_counts = (closure & ~adj & off_diagonal).sum(axis=(1, 2))
+        r5_counts = (r5 & off_diagonal).sum(axis=(1, 2))
+
+        # R2 и R4 - транспонированные R1 и R3 с тем же числом единиц
+        ones_counts[start:start + len(adj)] = 2 * r1_counts + 2 * r3_counts + r5_counts
+
+    H = np.zeros(batch_size)
+    if n > 1:
+        p_ij = 1 / (n - 1)
+        H = -(ones_counts * (p_ij * math.log2(p_ij)))
+
+    H_max = (1 / math.e) * n * 5
+    h = H / H_max if H_max > 0 else np.zeros(batch_size)
 
-    if H_max > 0:
-        h = H / H_max
-    else:
-        h = 0
-    
     return H, h
 
 
+def entropy_from_ones(ones_count: int, n: int, relations_count: int = 5) -> tuple[float, float]:
+    """
+    Энтропия H(M, R) и нормированная h(M, R) по числу единиц вне диагонали
+    во всех матрицах отношений: каждая единица даёт слагаемое -p*log2(p), p = 1/(n-1)
+    """
+    H = 0.0
+    if n > 1 and ones_count:
+        p_ij = 1 / (n - 1)
+        H = -(ones_count * (p_ij * math.log2(p_ij)))
+
+    H_max = (1 / math.e) * n * relations_count
+    h = H / H_max if H_max > 0 else 0
+
+    return H, h
+
+
+class SwapEntropyEvaluator:
+    """
+    Инкрементная оценка энтропии графов, отличающихся от базового заменой одного ребра
+
+    Отношения базового графа вычисляются один раз. Для замены ребра u->v на a->b
+    пересчитываются только строки замыкания предков u и a и строки/столбцы R5
+    для вершин v и b; по ним определяется изменение числа единиц в R1-R5.
+    Если у u больше INCREMENTAL_CLOSURE_MAX_ROWS предков (например, u в большой
+    компоненте сильной связности), замыкание изменённого графа считается целиком.
+    """
+
+    def __init__(self, edges: list[tuple[str, str]], vert_index: dict[str, int]):
+        self.edges = edges
+        self.vert_index = vert_index
+        self.n = n = len(vert_index)
+
+        # Кратность рёбер: удаление одного из повторяющихся рёбер не меняет граф
+        self.edge_counts = np.zeros((n, n), dtype=np.int32)
+        for v1, v2 in edges:
+            self.edge_counts[vert_index[v1], vert_index[v2]] += 1
+        self.adj = self.edge_counts > 0
+
+        self.closure = np.unpackbits(compute_closure_bits(self.adj), axis=1, count=n).astype(bool)
+
+        adj_float = self.adj.astype(np.float32)
+        self.r5 = (adj_float.T @ adj_float) > 0
+        np.fill_diagonal(self.r5, False)
+
+        off_diagonal = ~np.eye(n, dtype=bool)
+        self.r3_row_counts = (self.closure & ~self.adj & off_diagonal).sum(axis=1)
+        self.r1_count = int((self.adj & off_diagonal).sum())
+        self.r3_count = int(self.r3_row_counts.sum())
+        self.r5_count = int(self.r5.sum())
+
+        self.base_ones = 2 * self.r1_count + 2 * self.r3_count + self.r5_count
+        self.base_entropy = entropy_from_ones(self.base_ones, n)
+
+    def _adj_rows(self, rows: np.ndarray, row_overrides: dict) -> np.ndarray:
+        # Строки матрицы смежности изменённого графа
+        adj_rows = self.adj[rows]
+        for vertex, row in row_overrides.items():
+            adj_rows[rows == vertex] = row
+        return adj_rows
+
+    def _closure_rows_without_edge(self, u: int, v: int, row_u: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Удалённое ребро могли использовать только пути из предков u.
+        # Замыкания остальных вершин не меняются и не содержат затронутых вершин.
+        affected = self.closure[:, u].copy()
+        affected[u] = True
+        affected_rows = np.flatnonzero(affected)
+        overrides = {u: row_u}
+
+        new_rows = np.zeros((len(affected_rows), self.n), dtype=bool)
+        for row_pos, vertex in enumerate(affected_rows):
+            reach = new_rows[row_pos]
+            frontier = row_u.copy() if vertex == u else self.adj[vertex].copy()
+            while frontier.any():
+                reach |= frontier
+                unaffected_new = frontier & ~affected
+                if unaffected_new.any():
+                    reach |= self.closure[unaffected_new].any(axis=0)
+                expand = np.flatnonzero(frontier & affected)
+                frontier = self._adj_rows(expand, overrides).any(axis=0) & ~reach
+
+        return affected_rows, new_rows
+
+    def _r5_block_contribution(self, vertices: list[int], r5_rows: np.ndarray) -> int:
+        # Число единиц симметричной R5 в строках и столбцах vertices
+        return int(2 * r5_rows.sum() - r5_rows[:, vertices].sum())
+
+    def count_ones(self, remove_idx: int, new_edge: tuple[str, str]) -> int:
+        """Число единиц вне диагонали в R1-R5 после замены ребра edges[remove_idx] на new_edge"""
+        u, v = (self.vert_index[vertex] for vertex in self.edges[remove_idx])
+        a, b = (self.vert_index[vertex] for vertex in new_edge)
+
+        removed = self.edge_counts[u, v] == 1
+        still_present = self.adj[a, b] and not (removed and (a, b) == (u, v))
+        added = not still_present
+
+        # Изменённые строки матрицы смежности
+        row_overrides = {}
+        if removed:
+            row_u = self.adj[u].copy()
+            row_u[v] = False
+            row_overrides[u] = row_u
+        if added:
+            row_a = row_overrides.get(a, self.adj[a]).copy()
+            row_a[b] = True
+            row_overrides[a] = row_a
+
+        delta_r1 = -int(removed and u != v) + int(added and a != b)
+
+        # R3: при большом числе затронутых строк замыкание пересчитывается целиком
+        affected_count = self.closure[:, u].sum() + 1
+        if removed and affected_count > min(INCREMENTAL_CLOSURE_MAX_ROWS, self.n // 8):
+            delta_r3 = self._r3_count_rebuilt(row_overrides) - self.r3_count
+        else:
+            delta_r3 = self._r3_delta_incremental(u, v, a, b, removed, added, row_overrides)
+
+        # R5: меняются только строки и столбцы вершин, у которых изменились родители
+        r5_vertices = sorted(({v} if removed else set()) | ({b} if added else set()))
+        delta_r5 = 0
+        if r5_vertices:
+            new_r5_rows = np.zeros((len(r5_vertices), self.n), dtype=bool)
+            for row_pos, vertex in enumerate(r5_vertices):
+                parents_column = self.adj[:, vertex].copy()
+                for parent, row in row_overrides.items():
+                    parents_column[parent] = row[vertex]
+                parents = np.flatnonzero(parents_column)
+                new_r5_rows[row_pos] = self._adj_rows(parents, row_overrides).any(axis=0)
+                new_r5_rows[row_pos, vertex] = False
+
+            delta_r5 = (self._r5_block_contribution(r5_vertices, new_r5_rows)
+                        - self._r5_block_contribution(r5_vertices, self.r5[r5_vertices]))
+
+        return self.base_ones + 2 * delta_r1 + 2 * delta_r3 + delta_r5
+
+    def _r3_count_rebuilt(self, row_overrides: dict) -> int:
+        # Число единиц R3 по замыканию изменённого графа, вычисленному целиком
+        adj = self.adj.copy()
+        for vertex, row in row_overrides.items():
+            adj[vertex] = row
+        r3 = np.unpackbits(compute_closure_bits(adj), axis=1, count=self.n).astype(bool) & ~adj
+        np.fill_diagonal(r3, False)
+        return int(r3.sum())
+
+    def _r3_delta_incremental(self, u: int, v: int, a: int, b: int,
+                              removed: bool, added: bool, row_overrides: dict) -> int:
+        # Изменение числа единиц R3: замыкание после удаления, затем после добавления ребра
+        changed_rows = np.array(sorted({u, a}), dtype=np.int64)
+        new_closure = {}
+        if removed:
+            affected_rows, new_rows = self._closure_rows_without_edge(u, v, row_overrides[u])
+            new_closure.update(zip(affected_rows.tolist(), new_rows))
+        if added:
+            ancestors = self.closure[:, a].copy()
+            for vertex, row in new_closure.items():
+                ancestors[vertex] = row[a]
+            ancestors[a] = True
+            descendants = new_closure.get(b, self.closure[b]).copy()
+            descendants[b] = True
+            for vertex in np.flatnonzero(ancestors).tolist():
+                new_closure[vertex] = new_closure.get(vertex, self.closure[vertex]) | descendants
+
+        if new_closure:
+            changed_rows = np.union1d(changed_rows, np.fromiter(new_closure, dtype=np.int64))
+        closure_rows = self.closure[changed_rows]
+        for row_pos, vertex in enumerate(changed_rows.tolist()):
+            if vertex in new_closure:
+                closure_rows[row_pos] = new_closure[vertex]
+
+        r3_rows = closure_rows & ~self._adj_rows(changed_rows, row_overrides)
+        r3_rows[np.arange(len(changed_rows)), changed_rows] = False
+        return int(r3_rows.sum()) - int(self.r3_row_counts[changed_rows].sum())
+
+    def evaluate(self, remove_idx: int, new_edge: tuple[str, str]) -> tuple[float, float]:
+        """H(M, R) и h(M, R) графа с ребром new_edge вместо edges[remove_idx]"""
+        return entropy_from_ones(self.count_ones(remove_idx, new_edge), self.n)
+
+
+class EdgeMoveSpace:
+    """
+    Пространство кандидатов: замена ребра edges[remove_idx] на отсутствующее ребро new_edge
+
+    Кандидат с номером k = remove_idx * P + j, где j - номер нового ребра среди
+    упорядоченных пар вершин (v1 != v2), которых нет в графе (P - их число).
+    Новое ребро вычисляется по номеру через отсортированный список рангов
+    существующих рёбер, поэтому память - O(m) при любом размере пространства.
+    """
+
+    def __init__(self, edges: list[tuple[str, str]], vertexes: list[str]):
+        self.edges = edges
+        self.vertexes = vertexes
+        n = len(vertexes)
+        index = {v: i for i, v in enumerate(vertexes)}
+
+        # Ранг пары (v1, v2), v1 != v2, в порядке перебора v1, затем v2
+        existing_ranks = sorted({
+            index[v1] * (n - 1) + index[v2] - (index[v2] > index[v1])
+            for v1, v2 in set(edges)
+            if v1 in index and v2 in index and v1 != v2
+        })
+        # Число свободных пар перед t-м занятым рангом
+        self._free_before = [rank - t for t, rank in enumerate(existing_ranks)]
+
+        self.new_edges_count = n * (n - 1) - len(existing_ranks)
+        self.total = len(edges) * self.new_edges_count
+
+    def new_edge(self, j: int) -> tuple[str, str]:
+        """j-е отсутствующее в графе ребро"""
+        rank = j + bisect.bisect_right(self._free_before, j)
+        i1, rest = divmod(rank, len(self.vertexes) - 1)
+        i2 = rest + (rest >= i1)
+        return self.vertexes[i1], self.vertexes[i2]
+
+    def move(self, k: int) -> tuple[int, tuple[str, str]]:
+        """Кандидат с номером k в виде (remove_idx, new_edge)"""
+        remove_idx, j = divmod(k, self.new_edges_count)
+        return remove_idx, self.new_edge(j)
+
+
+def iter_edge_moves(edges: list[tuple[str, str]], vertexes: list[str], offset: int = 0,
+                    shard_index: int = 0, shard_count: int = 1):
+    """
+    Лениво порождает кандидатов (remove_idx, new_edge) в порядке generate_edge_permutations
+
+    Параметры:
+    offset: номер кандидата, с которого продолжается перебор
+    shard_index, shard_count: выдаются только кандидаты с номером k % shard_count == shard_index
+    """
+    space = EdgeMoveSpace(edges, vertexes)
+    first = offset + (shard_index - offset) % shard_count
+
+    for k in range(first, space.total, shard_count):
+        yield space.move(k)
+
+
+def apply_edge_move(edges: list[tuple[str, str]], move: tuple[int, tuple[str, str]]) -> list[tuple[str, str]]:
+    remove_idx, new_edge = move
+    new_edges = edges.copy()
+    new_edges[remove_idx] = new_edge
+    return new_edges
+
+
 def generate_edge_permutations(edges: list[tuple[str, str]], vertexes: list[str]) -> list[list[tuple[str, str]]]:
-    all_possible_edges = [
-        (v1, v2) for v1 in vertexes for v2 in vertexes 
-        if v1 != v2
+    return [apply_edge_move(edges, move) for move in iter_edge_moves(edges, vertexes)]
+
+
+
+def edge_pair_hash(i: int, j: int) -> int:
+    """128-битный хеш ребра (i, j) по индексам вершин, одинаковый во всех процессах и запусках"""
+    return int.from_bytes(hashlib.blake2b(i.to_bytes(8, 'little', signed=True) + j.to_bytes(8, 'little', signed=True),
+                                          digest_size=16).digest(), 'little')
+
+
+def edge_set_hash(edges: list[tuple[str, str]], vert_index: dict[str, int]) -> int:
+    """Хеш множества рёбер: XOR хешей различных пар, не зависит от порядка и кратности рёбер"""
+    set_hash = 0
+    for i, j in {(vert_index[v1], vert_index[v2]) for v1, v2 in edges}:
+        set_hash ^= edge_pair_hash(i, j)
+    return set_hash
+
+
+class EntropyCache:
+    """
+    LRU-кэш оценок энтропии по каноническому хешу множества рёбер
+
+    Ключ строится по множеству пар индексов вершин (кратность и порядок рёбер
+    не важны): хеш множества - XOR хешей пар (см. edge_pair_hash), поэтому при
+    замене ребра он пересчитывается за O(1). При isomorphism=True ключ инвариантен
+    к перенумерации вершин: вершины разбиваются на классы уточнением цветов
+    (Вейсфейлер-Леман), и из всех нумераций, согласованных с классами, берётся
+    лексикографически наименьшая матрица смежности. Если таких нумераций больше
+    permutation_limit, используется точный ключ множества рёбер - кэш никогда
+    не путает графы.
+
+    Канонизация стоит дороже инкрементной оценки одной замены, поэтому полный
+    перебор (search_best_swap) всегда использует ключи множества рёбер, а ключи
+    с точностью до изоморфизма - только эвристический поиск (optimize_entropy).
+    """
+
+    def __init__(self, max_size: int = 100000, isomorphism: bool = False,
+                 permutation_limit: int = 5040):
+        self.max_size = max_size
+        self.isomorphism = isomorphism
+        self.permutation_limit = permutation_limit
+        self.hits = 0
+        self.misses = 0
+        self._scores: collections.OrderedDict[str, tuple[float, float]] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def key(self, edges: list[tuple[str, str]], vert_index: dict[str, int]) -> str:
+        n = len(vert_index)
+        if self.isomorphism:
+            adj = np.zeros((n, n), dtype=bool)
+            for v1, v2 in edges:
+                adj[vert_index[v1], vert_index[v2]] = True
+            canonical = self._canonical_adjacency(adj)
+            if canonical is not None:
+                return 'c' + hashlib.blake2b(np.packbits(canonical).tobytes() + n.to_bytes(8, 'little'),
+                                             digest_size=16).hexdigest()
+
+        return self.edge_set_key(edge_set_hash(edges, vert_index), n)
+
+    @staticmethod
+    def edge_set_key(set_hash: int, n: int) -> str:
+        """Ключ графа на n вершинах по хешу множества его рёбер (см. edge_set_hash)"""
+        return 'e' + hashlib.blake2b(set_hash.to_bytes(16, 'little') + n.to_bytes(8, 'little'),
+                                     digest_size=16).hexdigest()
+
+    def _canonical_adjacency(self, adj: np.ndarray) -> np.ndarray | None:
+        n = adj.shape[0]
+        out_lists = [np.flatnonzero(row).tolist() for row in adj]
+        in_lists = [np.flatnonzero(column).tolist() for column in adj.T]
+
+        # Уточнение цветов: цвет вершины - её цвет и мультимножества цветов соседей
+        colors = [0] * n
+        while True:
+            signatures = [
+                (colors[v], bool(adj[v, v]),
+                 tuple(sorted(colors[u] for u in out_lists[v])),
+                 tuple(sorted(colors[u] for u in in_lists[v])))
+                for v in range(n)
+            ]
+            palette = {signature: color for color, signature in enumerate(sorted(set(signatures)))}
+            # Цвет входит в подпись, поэтому классы только дробятся; без дробления - устойчиво
+            is_stable = len(palette) == len(set(colors))
+            colors = [palette[signature] for signature in signatures]
+            if is_stable:
+                break
+
+        classes = [[v for v in range(n) if colors[v] == color] for color in sorted(set(colors))]
+        orderings_count = math.prod(math.factorial(len(members)) for members in classes)
+        if orderings_count > self.permutation_limit:
+            return None
+
+        best = None
+        for class_orders in itertools.product(*(itertools.permutations(members) for members in classes)):
+            order = [v for members in class_orders for v in members]
+            candidate = np.packbits(adj[np.ix_(order, order)]).tobytes()
+            if best is None or candidate < best:
+                best, best_order = candidate, order
+
+        return adj[np.ix_(best_order, best_order)]
+
+    def get(self, key: str) -> tuple[float, float] | None:
+        if key in self._scores:
+            self.hits += 1
+            self._scores.move_to_end(key)
+            return self._scores[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, score: tuple[float, float]) -> None:
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        while len(self._scores) > self.max_size:
+            self._scores.popitem(last=False)
+
+    def score(self, edges: list[tuple[str, str]], vert_index: dict[str, int], scorer=None) -> tuple[float, float]:
+        """Оценка графа из кэша либо вычисленная scorer(edges, vert_index) (по умолчанию calculate_entropy)"""
+        return self.score_by_key(self.key(edges, vert_index),
+                                 lambda: (scorer or calculate_entropy)(edges, vert_index))
+
+    def score_by_key(self, key: str, compute) -> tuple[float, float]:
+        """Оценка из кэша по готовому ключу либо вычисленная compute()"""
+        cached = self.get(key)
+        if cached is None:
+            cached = compute()
+            self.put(key, cached)
+        return cached
+
+    def save(self, path: str) -> None:
+        """Сохраняет кэш в JSON для использования в следующих запусках"""
+        with open(path, 'w', encoding='utf-8') as cache_file:
+            json.dump({"scores": list(self._scores.items())}, cache_file)
+
+    def load(self, path: str) -> None:
+        """Добавляет записи, сохранённые save(), если файл существует"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as cache_file:
+            saved = json.load(cache_file)
+        for key, score in saved["scores"]:
+            self.put(key, tuple(score))
+
+
+# Состояние рабочего процесса параллельного поиска
+_search_state = {}
+
+
+def _scan_moves(evaluator: SwapEntropyEvaluator, space: EdgeMoveSpace,
+                bounds: tuple[int, int], cache: EntropyCache = None) -> tuple[float, int, float, int]:
+    # Лучший кандидат на отрезке номеров [start, end): первый с максимальной H
+    # С кэшем ключ кандидата - хеш множества рёбер базового графа, обновлённый заменой
+    start, end = bounds
+    best_H, best_k, best_h = -float('inf'), -1, 0
+    vert_index = evaluator.vert_index
+    if cache is not None:
+        base_hash = edge_set_hash(space.edges, vert_index)
+
+    for k in range(start, end):
+        move = space.move(k)
+        if cache is None:
+            H, h_val = evaluator.evaluate(*move)
+        else:
+            remove_idx, new_edge = move
+            u, v = (vert_index[vertex] for vertex in space.edges[remove_idx])
+            a, b = (vert_index[vertex] for vertex in new_edge)
+            move_hash = base_hash
+            # Повторяющееся ребро остаётся в множестве, уже имеющееся - не добавляется
+            if evaluator.edge_counts[u, v] == 1:
+                move_hash ^= edge_pair_hash(u, v)
+            if evaluator.edge_counts[a, b] == 0:
+                move_hash ^= edge_pair_hash(a, b)
+            H, h_val = cache.score_by_key(cache.edge_set_key(move_hash, evaluator.n),
+                                          lambda: evaluator.evaluate(*move))
+        if H > best_H:
+            best_H, best_k, best_h = H, k, h_val
+
+    return best_H, best_k, best_h, end - start
+
+
+def _init_search_worker(edges: list[tuple[str, str]], vertexes: list[str], vert_index: dict[str, int],
+                        cache: EntropyCache = None) -> None:
+    _search_state["evaluator"] = SwapEntropyEvaluator(edges, vert_index)
+    _search_state["space"] = EdgeMoveSpace(edges, vertexes)
+    _search_state["cache"] = cache
+
+
+def _scan_moves_in_worker(bounds: tuple[int, int]) -> tuple[float, int, float, int]:
+    return _scan_moves(_search_state["evaluator"], _search_state["space"], bounds, _search_state["cache"])
+
+
+def print_search_progress(done: int, total: int, rate: float) -> None:
+    print(f"Проверено кандидатов: {done}/{total} ({rate:.0f} в секунду)")
+
+
+def search_best_swap(edges: list[tuple[str, str]], vertexes: list[str], vert_index: dict[str, int],
+                     workers: int = 1, chunk_size: int = 4096, progress=None,
+                     cache: EntropyCache = None) -> tuple[float, float, tuple[int, tuple[str, str]] | None]:
+    """
+    Полный перебор замен одного ребра с поиском максимума H(M, R)
+
+    Номера кандидатов делятся на отрезки по chunk_size, которые обрабатываются
+    в пуле из workers процессов (при workers == 1 - в текущем процессе).
+    Лучшие кандидаты отрезков сводятся по максимуму H, при равенстве выбирается
+    меньший номер - результат совпадает с последовательным перебором.
+
+    Параметры:
+    progress: функция progress(done, total, rate), вызываемая после каждого отрезка,
+              например print_search_progress
+    cache: EntropyCache для повторяющихся графов; в пуле каждый процесс работает со своей копией.
+           Ключи всегда строятся по множеству рёбер, isomorphism кэша здесь не используется
+
+    Возвращает:
+    H, h и лучший кандидат (remove_idx, new_edge) либо None, если кандидатов нет
+    """
+    space = EdgeMoveSpace(edges, vertexes)
+    chunks = [(start, min(start + chunk_size, space.total)) for start in range(0, space.total, chunk_size)]
+
+    best_H, best_k, best_h = -float('inf'), -1, 0
+    done = 0
+    started_at = time.perf_counter()
+
+    def reduce_chunk(chunk_result: tuple[float, int, float, int]) -> None:
+        nonlocal best_H, best_k, best_h, done
+        chunk_H, chunk_k, chunk_h, chunk_count = chunk_result
+        if chunk_k >= 0 and (chunk_H > best_H or (chunk_H == best_H and chunk_k < best_k)):
+            best_H, best_k, best_h = chunk_H, chunk_k, chunk_h
+
+        done += chunk_count
+        if progress is not None:
+            elapsed = time.perf_counter() - started_at
+            progress(done, space.total, done / elapsed if elapsed > 0 else 0.0)
+
+    if workers == 1:
+        evaluator = SwapEntropyEvaluator(edges, vert_index)
+        for bounds in chunks:
+            reduce_chunk(_scan_moves(evaluator, space, bounds, cache))
+    else:
+        with multiprocessing.Pool(workers, initializer=_init_search_worker,
+                                  initargs=(edges, vertexes, vert_index, cache)) as pool:
+            for chunk_result in pool.imap_unordered(_scan_moves_in_worker, chunks):
+                reduce_chunk(chunk_result)
+
+    if best_k < 0:
+        return best_H, best_h, None
+
+    return best_H, best_h, space.move(best_k)
+
+
+
+class SearchBudget:
+    """Ограничение эвристического поиска по числу оценок и/или времени (секунды)"""
+
+    def __init__(self, max_evaluations: int = None, time_limit: float = None):
+        if max_evaluations is None and time_limit is None:
+            raise ValueError("Нужно задать max_evaluations или time_limit")
+        if max_evaluations is not None and max_evaluations < 1:
+            # Хотя бы одна оценка нужна для исходного графа
+            raise ValueError("max_evaluations должно быть не меньше 1")
+        self.max_evaluations = max_evaluations
+        self.time_limit = time_limit
+        self.evaluations = 0
+        self.started_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def remaining_evaluations(self) -> int | float:
+        if self.max_evaluations is None:
+            return math.inf
+        return max(0, self.max_evaluations - self.evaluations)
+
+    def exhausted(self) -> bool:
+        return (self.remaining_evaluations() == 0
+                or (self.time_limit is not None and self.elapsed >= self.time_limit))
+
+
+def random_edge_swap(edges: list[tuple[str, str]], vertexes: list[str],
+                     rng: random.Random, k: int = 1) -> list[tuple[str, str]]:
+    """Заменяет k случайных рёбер на случайные отсутствующие в графе рёбра"""
+    new_edges = edges.copy()
+    existing_edges_set = set(new_edges)
+
+    for remove_idx in rng.sample(range(len(edges)), min(k, len(edges))):
+        # Случайные пары вершин до первой отсутствующей (в плотном графе замены может не быть)
+        for _ in range(100):
+            new_edge = (rng.choice(vertexes), rng.choice(vertexes))
+            if new_edge[0] != new_edge[1] and new_edge not in existing_edges_set:
+                existing_edges_set.add(new_edge)
+                new_edges[remove_idx] = new_edge
+                break
+
+    return new_edges
+
+
+def hill_climbing(edges, vertexes, score_batch, budget: SearchBudget, rng: random.Random,
+                  k: int = 1):
+    """Стохастический подъём: принимается первая улучшающая замена k рёбер"""
+    current_edges = edges
+    (current_H, current_h), = score_batch([edges])
+    yield current_edges, current_H, current_h
+
+    while not budget.exhausted():
+        candidate = random_edge_swap(current_edges, vertexes, rng, k)
+        (H, h_val), = score_batch([candidate])
+        if H > current_H:
+            current_edges, current_H, current_h = candidate, H, h_val
+            yield current_edges, current_H, current_h
+
+
+def simulated_annealing(edges, vertexes, score_batch, budget: SearchBudget, rng: random.Random,
+                        k: int = 1, initial_temperature: float = 1.0, cooling: float = 0.995,
+                        min_temperature: float = 1e-3):
+    """Имитация отжига: ухудшение dH принимается с вероятностью exp(dH / T)"""
+    current_edges = edges
+    (current_H, current_h), = score_batch([edges])
+    best_H = current_H
+    temperature = initial_temperature
+    yield current_edges, current_H, current_h
+
+    while not budget.exhausted():
+        candidate = random_edge_swap(current_edges, vertexes, rng, k)
+        (H, h_val), = score_batch([candidate])
+
+        if H >= current_H or rng.random() < math.exp((H - current_H) / temperature):
+            current_edges, current_H, current_h = candidate, H, h_val
+            if current_H > best_H:
+                best_H = current_H
+                yield current_edges, current_H, current_h
+
+        temperature = max(min_temperature, temperature * cooling)
+
+
+def beam_search(edges, vertexes, score_batch, budget: SearchBudget, rng: random.Random,
+                k: int = 1, beam_width: int = 8, branching: int = 16):
+    """Лучевой поиск: каждое состояние луча порождает branching замен k рёбер, лучшие beam_width остаются"""
+    (H, h_val), = score_batch([edges])
+    beam = [(H, h_val, edges)]
+    best_H = H
+    yield edges, H, h_val
+
+    while not budget.exhausted():
+        candidates = [random_edge_swap(state_edges, vertexes, rng, k)
+                      for _, _, state_edges in beam for _ in range(branching)]
+        scores = score_batch(candidates)
+        if not scores:
+            break
+
+        scored = [(H, h_val, candidate) for (H, h_val), candidate in zip(scores, candidates)]
+        # Сортировка устойчива, поэтому порядок при равных H воспроизводим
+        beam = sorted(beam + scored, key=lambda state: -state[0])[:beam_width]
+
+        if beam[0][0] > best_H:
+            best_H, best_h, best_edges = beam[0]
+            yield best_edges, best_H, best_h
+
+
+SEARCH_STRATEGIES = {
+    "hill_climbing": hill_climbing,
+    "annealing": simulated_annealing,
+    "beam": beam_search,
+}
+
+
+def optimize_entropy(edges: list[tuple[str, str]], vertexes: list[str], strategy: str = "annealing",
+                     k: int = 1, max_evaluations: int = None, time_limit: float = None,
+                     seed: int = None, cache: EntropyCache = None, callback=None, **params) -> dict:
+    """
+    Эвристический поиск графа с максимальной H(M, R) заменами k рёбер
+
+    Параметры:
+    strategy: имя стратегии из SEARCH_STRATEGIES
+    max_evaluations, time_limit: бюджет поиска (по умолчанию 1000 оценок)
+    seed: зерно генератора случайных чисел для воспроизводимости
+    cache: EntropyCache для повторяющихся графов
+    callback: функция callback(result), вызываемая при каждом улучшении с лучшим
+              на текущий момент результатом
+    params: параметры стратегии (температура, ширина луча и т.п.); параметры,
+            которых нет у выбранной стратегии, вызывают TypeError
+
+    Возвращает:
+    Словарь с лучшими рёбрами "edges", значениями "H" и "h", числом оценок
+    "evaluations" и траекторией сходимости "trace" - списком (оценки, секунды, H)
+    """
+    if max_evaluations is None and time_limit is None:
+        max_evaluations = 1000
+
+    budget = SearchBudget(max_evaluations, time_limit)
+    rng = random.Random(seed)
+    vert_index = {v: i for i, v in enumerate(vertexes)}
+    n = len(vertexes)
+
+    def score_batch(candidates: list[list[tuple[str, str]]]) -> list[tuple[float, float]]:
+        # Оценка не выходит за бюджет: лишние кандидаты отбрасываются
+        allowed = budget.remaining_evaluations()
+        candidates = candidates[:allowed] if allowed != math.inf else candidates
+        budget.evaluations += len(candidates)
+
+        if cache is not None:
+            return [cache.score(candidate, vert_index) for candidate in candidates]
+
+        adj_batch = np.zeros((len(candidates), n, n), dtype=bool)
+        for batch_idx, candidate in enumerate(candidates):
+            for v1, v2 in candidate:
+                adj_batch[batch_idx, vert_index[v1], vert_index[v2]] = True
+        H, h = calculate_entropy_batch(adj_batch)
+        return list(zip(H.tolist(), h.tolist()))
+
+    result = {"edges": edges, "H": -float('inf'), "h": 0, "evaluations": 0, "trace": []}
+    for best_edges, best_H, best_h in SEARCH_STRATEGIES[strategy](edges, vertexes, score_batch, budget, rng,
+                                                                 k=k, **params):
+        result.update(edges=best_edges, H=best_H, h=best_h, evaluations=budget.evaluations)
+        result["trace"].append((budget.evaluations, budget.elapsed, best_H))
+        if callback is not None:
+            callback(result)
+
+    result["evaluations"] = budget.evaluations
+    return result
+
+
+
+def test1():
+    """
+    Проверяет, что SwapEntropyEvaluator совпадает с calculate_entropy изменённого графа
+
+    Граф с длинной цепочкой, компонентой сильной связности и повторяющимся ребром
+    покрывает обе ветви пересчёта R3: строки немногих предков и замыкание целиком.
+    """
+    graph_edges = [
+        [("1", "2"), ("1", "3"), ("3", "4"), ("3", "5")],
+        [(f"v{i:02d}", f"v{i + 1:02d}") for i in range(47)]
+        + [("v30", "v10"), ("v05", "v06"), ("v03", "v20"), ("v40", "v40")],
     ]
+    for edges in graph_edges:
+        vertexes = sorted({vertex for edge in edges for vertex in edge})
+        vert_index = {v: i for i, v in enumerate(vertexes)}
+        evaluator = SwapEntropyEvaluator(edges, vert_index)
+        space = EdgeMoveSpace(edges, vertexes)
 
-    existing_edges_set = set(edges)
-    possible_new_edges = [edge for edge in all_possible_edges if edge not in existing_edges_set]
-    
-    permutations = []
-    for remove_idx, new_edge in itertools.product(range(len(edges)), possible_new_edges):
-        new_edges = edges.copy()
-        new_edges[remove_idx] = new_edge
-        permutations.append(new_edges)
-    
-    return permutations
+        # Кроме кандидатов перебора - замены на то же ребро, на имеющееся ребро и на петлю
+        moves = [space.move(k) for k in range(0, space.total, max(1, space.total // 1000))]
+        moves += [(remove_idx, edges[remove_idx]) for remove_idx in range(len(edges))]
+        moves += [(remove_idx, edges[0]) for remove_idx in range(len(edges))]
+        moves += [(remove_idx, (vertexes[1], vertexes[1])) for remove_idx in range(len(edges))]
+
+        for move in moves:
+            expected_H, expected_h = calculate_entropy(apply_edge_move(edges, move), vert_index)
+            H, h = evaluator.evaluate(*move)
+            assert abs(H - expected_H) < 1e-9 and abs(h - expected_h) < 1e-9, \
+                f"Инкрементная оценка расходится с полным пересчётом для {move}!"
 
 
+def main(s: str | tuple, e: str, workers: int = 1, progress=None) -> tuple[float, float]:
+    # s - строка CSV либо результат read_edge_arrays
+    # workers и progress передаются в search_best_swap
+    if isinstance(s, str):
+        edges: list[tuple[str, str]] = [tuple(edge.split(',')) for edge in s.split('\n')]
+    else:
+        sources, targets, vertices = s
+        edges = list(zip(vertices[sources].tolist(), vertices[targets].tolist()))
 
-def main(s: str, e: str) -> tuple[float, float]:
-    edges: list[tuple[str, str]] = [tuple(edge.split(',')) for edge in s.split('\n')]
     vertexes = set()
 
     for edge in edges:
         v1, v2 = edge[0], edge[1]
-        vertexes.update(v1, v2)
+        vertexes.update((v1, v2))
     
     vertexes = sorted(list(vertexes))
 
     vert2indx = {v: i for i, v in enumerate(vertexes)}
 
-    all_permutations = generate_edge_permutations(edges, vertexes)
-    
-    best_H = -float('inf')
-    best_h = 0
-    best_edges = None
-    
-    for perm_edges in all_permutations:
-        H, h_val = calculate_entropy(perm_edges, vert2indx)
-        
-        if H > best_H:
-            best_H = H
-            best_h = h_val
-            best_edges = perm_edges.copy()
+    # Отношения базового графа считаются один раз, кандидаты оцениваются приращениями
+    best_H, best_h, best_move = search_best_swap(edges, vertexes, vert2indx,
+                                                 workers=workers, progress=progress)
+    best_edges = apply_edge_move(edges, best_move) if best_move else None
 
     if best_edges:
         print(f"\nНайдена лучшая перестановка:\nБыло: {edges}\nСтало: {best_edges}")
@@ -142,6 +1317,13 @@ def main(s: str, e: str) -> tuple[float, float]:
 
 
 if __name__ == "__main__":
+    try:
+        test1()
+    except AssertionError:
+        print("Тест не пройден")
+    else:
+        print("Тест пройден успешно!")
+
     csv_path = 'data/task2.csv'
 
     graph_string: str = read_csv(csv_path)
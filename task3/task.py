@@ -1,4 +1,7 @@
+import itertools
 import json
+import multiprocessing
+
 import numpy as np
 
 
@@ -47,6 +50,170 @@ def find_connected_components(closure_matrix: np.ndarray) -> list[list[int]]:
     return connected_components
 
 
+def find_equivalence_clusters(equivalent_pairs: np.ndarray, num_objects: int) -> list[list[int]]:
+    """
+    Кластеры эквивалентности по разреженному списку эквивалентных пар (система непересекающихся множеств)
+
+    Параметры:
+    equivalent_pairs: массив пар (i, j) формы (k, 2), индексы с 0
+    num_objects: число объектов
+
+    Возвращает:
+    Кластеры в 1-индексации в том же виде, что find_connected_components(warshall_algorithm(...)):
+    элементы кластера упорядочены, кластеры - по наименьшему элементу
+    """
+    parent = list(range(num_objects))
+
+    def find_root(vertex: int) -> int:
+        # Поиск корня со сжатием пути делением пополам
+        while parent[vertex] != vertex:
+            parent[vertex] = parent[parent[vertex]]
+            vertex = parent[vertex]
+        return vertex
+
+    for first, second in np.asarray(equivalent_pairs).reshape(-1, 2).tolist():
+        first_root, second_root = find_root(first), find_root(second)
+        if first_root != second_root:
+            # Корнем становится меньший элемент
+            parent[max(first_root, second_root)] = min(first_root, second_root)
+
+    clusters: dict[int, list[int]] = {}
+    for vertex in range(num_objects):
+        clusters.setdefault(find_root(vertex), []).append(vertex + 1)
+
+    return list(clusters.values())
+
+
+def object_sort_key(obj) -> tuple:
+    """Ключ упорядочивания идентификаторов объектов: числа по значению, затем строки"""
+    return (isinstance(obj, str), obj)
+
+
+def collect_objects(rankings: list[list]) -> list:
+    """
+    Упорядоченный список различных объектов ранжировок
+
+    Индекс объекта в этом списке - его плотный номер 0..n-1 в векторах позиций и матрицах,
+    поэтому память зависит только от числа различных объектов, а не от величины их номеров.
+    """
+    all_objects = set()
+    for ranking in rankings:
+        for cluster in ranking:
+            if not isinstance(cluster, list):
+                cluster = [cluster]
+            all_objects.update(cluster)
+
+    return sorted(all_objects, key=object_sort_key)
+
+
+def ranking_positions(ranking: list, object_index: dict) -> np.ndarray:
+    """
+    Вектор позиций объектов в ранжировке (номер кластера - позиция)
+
+    Параметры:
+    ranking: ранжировка
+    object_index: плотные номера объектов {объект: индекс} (см. collect_objects)
+
+    Объекты, отсутствующие в ранжировке, образуют общий кластер после последнего,
+    т.е. получают позицию len(ranking).
+    """
+    object_positions = np.full(len(object_index), len(ranking), dtype=np.int64)
+
+    for current_position, cluster in enumerate(ranking):
+        if not isinstance(cluster, list):
+            cluster = [cluster]
+        for obj in cluster:
+            object_positions[object_index[obj]] = current_position
+
+    return object_positions
+
+
+def relabel_result(result: dict, objects: list) -> dict:
+    """
+    Переводит результат agree_positions из плотных номеров (с 1) в исходные объекты
+    """
+    relabeled = dict(result)
+    relabeled["kernel"] = [[objects[first - 1], objects[second - 1]] for first, second in result["kernel"]]
+    relabeled["consistent_ranking"] = [
+        [objects[obj - 1] for obj in cluster] if isinstance(cluster, list) else objects[cluster - 1]
+        for cluster in result["consistent_ranking"]
+    ]
+    return relabeled
+
+
+def _discordance_order(positions_a: np.ndarray, positions_b: np.ndarray) -> np.ndarray:
+    # Объекты по возрастанию позиции в A, при равенстве - по возрастанию позиции в B.
+    # Тогда инверсии позиций B в этом порядке - ровно пары с противоположным строгим порядком.
+    return np.lexsort((positions_b, positions_a))
+
+
+def count_contradictions(positions_a: np.ndarray, positions_b: np.ndarray) -> int:
+    """
+    Точное число пар ядра противоречий за O(n log n) (дерево Фенвика)
+
+    Пара входит в ядро, если один объект строго раньше другого в A и строго позже в B.
+    """
+    order = _discordance_order(positions_a, positions_b)
+    # Ранги позиций B начиная с 1 для дерева Фенвика
+    b_ranks = (np.unique(positions_b, return_inverse=True)[1] + 1)[order].tolist()
+    tree = [0] * (len(b_ranks) + 1)
+    contradictions = 0
+
+    for processed, rank in enumerate(b_ranks):
+        # Число уже пройденных объектов с рангом <= rank
+        not_greater, index = 0, rank
+        while index > 0:
+            not_greater += tree[index]
+            index -= index & -index
+        contradictions += processed - not_greater
+
+        index = rank
+        while index < len(tree):
+            tree[index] += 1
+            index += index & -index
+
+    return contradictions
+
+
+def iter_contradictions(positions_a: np.ndarray, positions_b: np.ndarray):
+    """
+    Потоково перечисляет пары ядра противоречий за O(n log n + k)
+
+    Объекты упорядочиваются по позиции в A, инверсии позиций B находятся
+    восходящей сортировкой слиянием: когда при слиянии берётся элемент правой
+    половины, все оставшиеся элементы левой половины образуют с ним инверсию.
+
+    Возвращает:
+    Итератор пар индексов объектов (i, j), i < j, в порядке обнаружения
+    """
+    order = _discordance_order(positions_a, positions_b).tolist()
+    b_values = positions_b.tolist()
+    runs = [[(b_values[obj], obj)] for obj in order]
+
+    while len(runs) > 1:
+        merged_runs = []
+        for run_idx in range(0, len(runs) - 1, 2):
+            left, right = runs[run_idx], runs[run_idx + 1]
+            merged = []
+            left_pos = right_pos = 0
+            while left_pos < len(left) and right_pos < len(right):
+                if left[left_pos][0] <= right[right_pos][0]:
+                    merged.append(left[left_pos])
+                    left_pos += 1
+                else:
+                    right_obj = right[right_pos][1]
+                    for _, left_obj in left[left_pos:]:
+                        yield (left_obj, right_obj) if left_obj < right_obj else (right_obj, left_obj)
+                    merged.append(right[right_pos])
+                    right_pos += 1
+            merged.extend(left[left_pos:])
+            merged.extend(right[right_pos:])
+            merged_runs.append(merged)
+        if len(runs) % 2:
+            merged_runs.append(runs[-1])
+        runs = merged_runs
+
+
 def compare_clusters(cluster1: list[int], cluster2: list[int], precedence_matrix: np.ndarray) -> int:
     """
     Сравнивает два кластера на основе матрицы предшествования
@@ -72,6 +239,116 @@ def compare_clusters(cluster1: list[int], cluster2: list[int], precedence_matrix
         return 0   # Отношение не определено
 
 
+def build_consistent_ranking(preference_matrix: np.ndarray) -> list:
+    """
+    Строит согласованную ранжировку по матрице предпочтения
+    
+    Объекты, предпочтительные друг другу, объединяются в кластеры эквивалентности,
+    кластеры упорядочиваются топологической сортировкой.
+    """
+    # Матрица эквивалентности
+    equivalence_matrix = preference_matrix & preference_matrix.T
+    
+    # Кластеры эквивалентности - компоненты связности графа эквивалентных пар
+    equivalent_pairs = np.argwhere(np.triu(equivalence_matrix, 1))
+    equivalence_clusters = find_equivalence_clusters(equivalent_pairs, len(preference_matrix))
+    
+    # Матрица порядка между кластерами по первым элементам кластеров
+    representatives = np.array([cluster[0] - 1 for cluster in equivalence_clusters])
+    cluster_order_matrix = preference_matrix[np.ix_(representatives, representatives)]
+    np.fill_diagonal(cluster_order_matrix, False)
+    
+    # Между разными кластерами порядок - транзитивный турнир: его топологический
+    # порядок - кластеры по возрастанию числа предшествующих кластеров
+    return order_equivalence_clusters(equivalence_clusters, cluster_order_matrix.sum(axis=0))
+
+
+def order_equivalence_clusters(equivalence_clusters: list[list[int]], cluster_ranks: np.ndarray) -> list:
+    """
+    Упорядочивает кластеры эквивалентности в согласованную ранжировку
+    
+    Параметры:
+    equivalence_clusters: кластеры в 1-индексации (см. find_equivalence_clusters)
+    cluster_ranks: ключ порядка кластеров, кластеры идут по его возрастанию (сортировка устойчива)
+    """
+    topological_order = np.argsort(cluster_ranks, kind='stable').tolist()
+    
+    # Строим согласованную ранжировку
+    consistent_ranking = []
+    for cluster_idx in topological_order:
+        current_cluster = equivalence_clusters[cluster_idx]
+        if len(current_cluster) == 1:
+            consistent_ranking.append(current_cluster[0])
+        else:
+            consistent_ranking.append(current_cluster)
+    
+    return consistent_ranking
+
+
+def agree_positions(positions_a: np.ndarray, positions_b: np.ndarray) -> dict:
+    """
+    Согласует две ранжировки, заданные векторами позиций объектов (см. ranking_positions)
+    
+    Возвращает:
+    Словарь с ядром противоречий и согласованной ранжировкой
+    """
+    if not len(positions_a):
+        return {"kernel": [], "consistent_ranking": []}
+    
+    # Ядро противоречий - пары с противоположным строгим порядком, упорядоченные по (i, j)
+    kernel_count = count_contradictions(positions_a, positions_b)
+    kernel_pairs = np.fromiter(itertools.chain.from_iterable(iter_contradictions(positions_a, positions_b)),
+                               dtype=np.int64, count=2 * kernel_count).reshape(-1, 2)
+    kernel_pairs = kernel_pairs[np.lexsort((kernel_pairs[:, 1], kernel_pairs[:, 0]))]
+    
+    # Объекты эквивалентны (предпочтительны друг другу), если они - пара ядра
+    # или стоят на одинаковых позициях в обеих ранжировках; для системы
+    # непересекающихся множеств достаточно соседних пар в группах равных позиций
+    order = _discordance_order(positions_a, positions_b)
+    same_positions = ((positions_a[order[1:]] == positions_a[order[:-1]])
+                      & (positions_b[order[1:]] == positions_b[order[:-1]]))
+    tie_pairs = np.stack([order[:-1][same_positions], order[1:][same_positions]], axis=1)
+    equivalence_clusters = find_equivalence_clusters(np.concatenate([kernel_pairs, tie_pairs]), len(positions_a))
+    
+    # Объект i предшествует объекту j, если его позиции в обеих ранжировках >= позиций j.
+    # Первые элементы разных кластеров не эквивалентны, поэтому предшествующий кластер
+    # строго больше хотя бы по одной позиции и имеет строго большую сумму позиций
+    representatives = np.array([cluster[0] - 1 for cluster in equivalence_clusters])
+    cluster_ranks = -(positions_a[representatives] + positions_b[representatives])
+    
+    return {
+        "kernel": (kernel_pairs + 1).tolist(),
+        "consistent_ranking": order_equivalence_clusters(equivalence_clusters, cluster_ranks)
+    }
+
+
+def test1():
+    """
+    Проверяет count_contradictions и iter_contradictions полным перебором пар объектов
+    """
+    ranking_pairs = [
+        ([1, [2, 3], 4, [5, 6, 7], 8, 9, 10], [[8, 7], 5, [1, 2], 3, 6, [10, 9]]),
+        ([1, 2, 3, 4, 5], [5, 4, 3, 2, 1]),
+        ([[1, 2, 3, 4]], [4, 3, [2, 1]]),
+        ([[1, 2], 3], [[1, 2], 3]),
+        # Перестановка с группами равных позиций: все длины отрезков сортировки слиянием
+        ([[3 * i, 3 * i + 1, 3 * i + 2] for i in range(34)], [(37 * i) % 101 for i in range(101)]),
+    ]
+    for ranking_a, ranking_b in ranking_pairs:
+        objects = collect_objects([ranking_a, ranking_b])
+        object_index = {obj: idx for idx, obj in enumerate(objects)}
+        positions_a = ranking_positions(ranking_a, object_index)
+        positions_b = ranking_positions(ranking_b, object_index)
+
+        expected_pairs = [(i, j) for i in range(len(objects)) for j in range(i + 1, len(objects))
+                          if (positions_a[i] - positions_a[j]) * (positions_b[i] - positions_b[j]) < 0]
+        found_pairs = list(iter_contradictions(positions_a, positions_b))
+
+        assert count_contradictions(positions_a, positions_b) == len(expected_pairs), "Неверное число пар ядра!"
+        assert len(found_pairs) == len(set(found_pairs)), "Пары ядра перечислены повторно!"
+        assert sorted(found_pairs) == expected_pairs, "Перечисленные пары не совпадают с ядром!"
+
+
 def main(json_ranking_a: str, json_ranking_b: str) -> dict:
     """
     Основная функция для согласования двух ранжировок
@@ -87,161 +364,145 @@ def main(json_ranking_a: str, json_ranking_b: str) -> dict:
     ranking_a = json.loads(json_ranking_a)
     ranking_b = json.loads(json_ranking_b)
     
-    # Определяем множество всех объектов из обеих ранжировок
-    all_objects = set()
-    for ranking in [ranking_a, ranking_b]:
-        for cluster in ranking:
-            if not isinstance(cluster, list):
-                cluster = [cluster]
-            all_objects.update(cluster)
+    # Плотная нумерация всех объектов из обеих ранжировок
+    objects = collect_objects([ranking_a, ranking_b])
     
     # Если нет объектов, возвращаем пустой результат
-    if not all_objects:
+    if not objects:
         return {"kernel": [], "consistent_ranking": []}
     
-    # Определяем максимальный номер объекта
-    max_object_id = max(all_objects)
-    
-    def build_precedence_matrix(ranking: list) -> np.ndarray:
-        #Стрит матрицу предшествования на основе ранжировки
-        # Позиция каждого объекта в ранжировке
-        object_positions = [0] * max_object_id
-        current_position = 0
-        
-        # Присваиваем позиции объектам
-        for cluster in ranking:
-            if not isinstance(cluster, list):
-                cluster = [cluster]
-            for obj in cluster:
-                object_positions[obj - 1] = current_position
-            current_position += 1
-        
-        # Строим матрицу предшествования
-        precedence_matrix = np.zeros((max_object_id, max_object_id), dtype=int)
-        for i in range(max_object_id):
-            for j in range(max_object_id):
-                # Объект i предшествует объекту j, если его позиция >= позиции j
-                if object_positions[i] >= object_positions[j]:
-                    precedence_matrix[i, j] = 1
-        
-        return precedence_matrix
-    
-    # Строим матрицы предшествования для обеих ранжировок
-    precedence_matrix_a = build_precedence_matrix(ranking_a)
-    precedence_matrix_b = build_precedence_matrix(ranking_b)
-    
-    # Вычисляем матрицу согласованности (логическое И)
-    consistency_matrix = precedence_matrix_a * precedence_matrix_b
+    object_index = {obj: idx for idx, obj in enumerate(objects)}
     
-    # Транспонированные матрицы
-    transposed_matrix_a = precedence_matrix_a.T
-    transposed_matrix_b = precedence_matrix_b.T
+    # Позиции объектов в обеих ранжировках
+    positions_a = ranking_positions(ranking_a, object_index)
+    positions_b = ranking_positions(ranking_b, object_index)
     
-    # Матрица противоречий (логическое И транспонированных матриц)
-    conflict_matrix = transposed_matrix_a * transposed_matrix_b
-    
-    # Находим ядро противоречий - пары объектов без определенных отношений
-    kernel_contradictions = []
-    for i in range(max_object_id):
-        for j in range(i + 1, max_object_id):
-            if consistency_matrix[i, j] == 0 and conflict_matrix[i, j] == 0:
-                kernel_contradictions.append([i + 1, j + 1])
-    
-    # Матрицы частичного порядка
-    partial_order_1 = precedence_matrix_a * transposed_matrix_b
-    partial_order_2 = transposed_matrix_a * precedence_matrix_b
-    
-    # Объединенная матрица частичного порядка
-    partial_order_union = np.logical_or(partial_order_1, partial_order_2).astype(int)
-    
-    # Матрица предпочтения (общая согласованность)
-    preference_matrix = precedence_matrix_a * precedence_matrix_b
-    
-    # Добавляем в матрицу предпочтения пары из ядра противоречий
-    for pair in kernel_contradictions:
-        i, j = pair[0] - 1, pair[1] - 1
-        preference_matrix[i, j] = 1
-        preference_matrix[j, i] = 1
-    
-    # Матрица эквивалентности
-    equivalence_matrix = preference_matrix * preference_matrix.T
-    
-    # Транзитивное замыкание матрицы эквивалентности
-    equivalence_closure = warshall_algorithm(equivalence_matrix)
-    
-    # Находим сильно связные компоненты (кластеры эквивалентности)
-    equivalence_clusters = find_connected_components(equivalence_closure)
-    
-    # Строим матрицу порядка между кластерами
-    num_clusters = len(equivalence_clusters)
-    cluster_order_matrix = np.zeros((num_clusters, num_clusters), dtype=int)
+    return relabel_result(agree_positions(positions_a, positions_b), objects)
+
+
+def aggregate_rankings(json_rankings) -> dict:
+    """
+    Согласует ранжировки K экспертов, поступающие по одной
     
-    for i in range(num_clusters):
-        for j in range(num_clusters):
-            if i != j:
-                # Берем первый элемент каждого кластера для сравнения
-                element_i = equivalence_clusters[i][0] - 1
-                element_j = equivalence_clusters[j][0] - 1
-                if preference_matrix[element_i, element_j] == 1:
-                    cluster_order_matrix[i, j] = 1
+    Для каждой пары объектов накапливается число ранжировок, в которых i
+    предшествует j (позиция i >= позиции j), в одной матрице счётчиков uint16
+    (uint32 при большом числе ранжировок). Пара согласована, если отношение
+    выполняется во всех K ранжировках; ядро противоречий - пары, у которых
+    нет единогласия ни в одном направлении. При K = 2 результат совпадает с main.
     
-    # Топологическая сортировка кластеров
-    visited_clusters = [False] * num_clusters
-    topological_order = []
+    Объекты нумеруются плотно в порядке появления; отсутствующий в ранжировке
+    объект стоит в ней после последнего кластера (см. ranking_positions).
     
-    def topological_sort(current_cluster: int):
-        """Рекурсивная функция топологической сортировки"""
-        visited_clusters[current_cluster] = True
-        for next_cluster in range(num_clusters):
-            if cluster_order_matrix[current_cluster, next_cluster] == 1 and not visited_clusters[next_cluster]:
-                topological_sort(next_cluster)
-        topological_order.append(current_cluster)
+    Параметры:
+    json_rankings: итерируемая последовательность JSON-строк с ранжировками
     
-    for cluster_idx in range(num_clusters):
-        if not visited_clusters[cluster_idx]:
-            topological_sort(cluster_idx)
+    Возвращает:
+    Словарь с ядром противоречий, согласованной ранжировкой и числом ранжировок
+    """
+    precedence_counts = np.zeros((0, 0), dtype=np.uint16)
+    object_index = {}
+    # Число ранжировок, в которых объект отсутствует
+    absent_counts = np.zeros(0, dtype=np.int64)
+    num_rankings = 0
+    
+    for json_ranking in json_rankings:
+        ranking = json.loads(json_ranking)
+        known_objects = len(object_index)
+        for obj in collect_objects([ranking]):
+            object_index.setdefault(obj, len(object_index))
+        
+        if len(object_index) > known_objects:
+            # В прошлых ранжировках новые объекты отсутствовали, т.е. стояли после всех кластеров
+            grown_counts = np.zeros((len(object_index), len(object_index)), dtype=precedence_counts.dtype)
+            grown_counts[:known_objects, :known_objects] = precedence_counts
+            grown_counts[:known_objects, known_objects:] = absent_counts[:, np.newaxis]
+            grown_counts[known_objects:, :] = num_rankings
+            precedence_counts = grown_counts
+            absent_counts = np.concatenate([
+                absent_counts, np.full(len(object_index) - known_objects, num_rankings)
+            ])
+        
+        if num_rankings == np.iinfo(precedence_counts.dtype).max:
+            precedence_counts = precedence_counts.astype(np.uint32)
+        
+        positions = ranking_positions(ranking, object_index)
+        precedence_counts += positions[:, np.newaxis] >= positions[np.newaxis, :]
+        absent_counts += positions == len(ranking)
+        num_rankings += 1
+    
+    if not num_rankings or not object_index:
+        return {"kernel": [], "consistent_ranking": [], "rankings": num_rankings}
+    
+    # Переход от порядка появления к упорядоченным объектам, как в main
+    objects = sorted(object_index, key=object_sort_key)
+    order = np.array([object_index[obj] for obj in objects])
+    unanimous_matrix = precedence_counts[np.ix_(order, order)] == num_rankings
+    kernel_rows, kernel_cols = np.nonzero(np.triu(~(unanimous_matrix | unanimous_matrix.T), 1))
+    
+    preference_matrix = unanimous_matrix
+    preference_matrix[kernel_rows, kernel_cols] = True
+    preference_matrix[kernel_cols, kernel_rows] = True
+    
+    return relabel_result({
+        "kernel": np.stack([kernel_rows + 1, kernel_cols + 1], axis=1).tolist(),
+        "consistent_ranking": build_consistent_ranking(preference_matrix),
+        "rankings": num_rankings
+    }, objects)
+
+
+def compare_all_pairs(json_rankings: list[str], workers: int = 1) -> dict[tuple[int, int], dict]:
+    """
+    Попарно согласует все ранжировки
     
-    topological_order.reverse()
+    Каждая ранжировка разбирается и переводится в вектор позиций по общей
+    плотной нумерации один раз, сравнения пар выполняются в пуле из workers процессов.
     
-    # Строим согласованную ранжировку
-    consistent_ranking = []
-    for cluster_idx in topological_order:
-        current_cluster = equivalence_clusters[cluster_idx]
-        if len(current_cluster) == 1:
-            consistent_ranking.append(current_cluster[0])
-        else:
-            consistent_ranking.append(current_cluster)
+    Возвращает:
+    Словарь {(i, j): результат main для ранжировок i и j}, i < j
+    """
+    rankings = [json.loads(json_ranking) for json_ranking in json_rankings]
+    objects = collect_objects(rankings)
+    object_index = {obj: idx for idx, obj in enumerate(objects)}
+    all_positions = [ranking_positions(ranking, object_index) for ranking in rankings]
+    present_objects = [np.flatnonzero(positions != len(ranking))
+                       for ranking, positions in zip(rankings, all_positions)]
+    
+    pairs = list(itertools.combinations(range(len(rankings)), 2))
+    tasks, pair_objects = [], []
+    for first, second in pairs:
+        # Как и в main, объекты пары - объекты хотя бы одной из двух ранжировок
+        pair_indices = np.union1d(present_objects[first], present_objects[second])
+        pair_objects.append([objects[idx] for idx in pair_indices.tolist()])
+        tasks.append((all_positions[first][pair_indices], all_positions[second][pair_indices]))
+    
+    if workers == 1:
+        results = [agree_positions(*task) for task in tasks]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.starmap(agree_positions, tasks)
     
-    return {
-        "kernel": kernel_contradictions,
-        "consistent_ranking": consistent_ranking
-    }
-
+    return {pair: relabel_result(result, pair_object_list)
+            for pair, result, pair_object_list in zip(pairs, results, pair_objects)}
 
 if __name__ == "__main__":
-    json_ranking_a = read_json_file('range_a.json')
-    json_ranking_b = read_json_file('range_b.json')
-    json_ranking_c = read_json_file('range_c.json')
+    try:
+        test1()
+    except AssertionError:
+        print("Тест не пройден")
+    else:
+        print("Тест пройден успешно!")
+
+    ranking_files = ['range_a.json', 'range_b.json', 'range_c.json']
+    json_rankings = [read_json_file(file_name) for file_name in ranking_files]
     
     print("СРАВНЕНИЕ РАНЖИРОВОК")
     print("=" * 50)
     
-    # Сравнение ранжировок A и B
-    print("\nСравнение range_a.json и range_b.json:")
-    comparison_result_ab = main(json_ranking_a, json_ranking_b)
-    print(f"Ядро противоречий: {comparison_result_ab['kernel']}")
-    print(f"Согласованная ранжировка: {comparison_result_ab['consistent_ranking']}")
-    
-    # Сравнение ранжировок A и C
-    print("\nСравнение range_a.json и range_c.json:")
-    comparison_result_ac = main(json_ranking_a, json_ranking_c)
-    print(f"Ядро противоречий: {comparison_result_ac['kernel']}")
-    print(f"Согласованная ранжировка: {comparison_result_ac['consistent_ranking']}")
-    
-    # Сравнение ранжировок B и C
-    print("\nСравнение range_b.json и range_c.json:")
-    comparison_result_bc = main(json_ranking_b, json_ranking_c)
-    print(f"Ядро противоречий: {comparison_result_bc['kernel']}")
-    print(f"Согласованная ранжировка: {comparison_result_bc['consistent_ranking']}")
+    # Попарное сравнение ранжировок: A и B, A и C, B и C
+    comparison_results = compare_all_pairs(json_rankings)
+    for (first, second), comparison_result in comparison_results.items():
+        print(f"\nСравнение {ranking_files[first]} и {ranking_files[second]}:")
+        print(f"Ядро противоречий: {comparison_result['kernel']}")
+        print(f"Согласованная ранжировка: {comparison_result['consistent_ranking']}")
     
     print("\n" + "=" * 50)
\ No newline at end of file
@@ -1,4 +1,14 @@
+import bisect
 import json
+from functools import lru_cache
+
+import numpy as np
+
+# Входная переменная однотипных правил mapping.json [терм температуры, терм нагрева]
+TEMPERATURE_VARIABLE = 'температура'
+
+# Операции объединения условий правил с несколькими входами
+RULE_OPERATORS = {"and": min, "or": max}
 
 
 def read_json_file(file_path: str) -> str:
@@ -7,9 +17,9 @@ def read_json_file(file_path: str) -> str:
     return json_content
 
 
-def parse_fuzzy_terms_json(json_string: str) -> dict:
+def parse_fuzzy_terms_json(json_string: str, variable_name: str = TEMPERATURE_VARIABLE) -> dict:
     parsed_data = json.loads(json_string)
-    temperature_terms = parsed_data['температура']
+    temperature_terms = parsed_data[variable_name]
     
     fuzzy_terms_dict = dict()
     for term_data in temperature_terms:
@@ -74,6 +84,86 @@ def calculate_trapezoidal_membership(fuzzy_terms: dict,
         return 0.0
 
 
+def trapezoidal_membership_array(term_points: list, input_values: np.ndarray) -> np.ndarray:
+    """
+    Векторный аналог calculate_trapezoidal_membership для массива входных значений
+
+    Ветви и арифметика те же, что в скалярной функции, поэтому значения совпадают поэлементно.
+    """
+    (x1, y1), (x2, y2), (x3, y3), (x4, y4) = term_points
+    input_values = np.asarray(input_values, dtype=np.float64)
+
+    def segment(x_start, y_start, x_end, y_end):
+        if x_start == x_end:
+            return np.full(input_values.shape, y_start, dtype=np.float64)
+        return y_start + (y_end - y_start) * (input_values - x_start) / (x_end - x_start)
+
+    # Условия в порядке проверки скалярной функцией: срабатывает первое истинное
+    return np.select(
+        [input_values <= x1, input_values >= x4,
+         input_values <= x2, input_values <= x3, input_values <= x4],
+        [np.full(input_values.shape, y1, dtype=np.float64), np.full(input_values.shape, y4, dtype=np.float64),
+         segment(x1, y1, x2, y2), segment(x2, y2, x3, y3), segment(x3, y3, x4, y4)],
+        default=0.0
+    )
+
+
+def term_support(term_points: list) -> tuple[float, float] | None:
+    """
+    Отрезок, вне которого принадлежность терма не больше нуля
+
+    Возвращает:
+    (нижняя, верхняя) граница, возможно бесконечные; None, если терм нигде не положителен
+    """
+    x_coords = [x_coord for x_coord, _ in term_points]
+    y_coords = [y_coord for _, y_coord in term_points]
+
+    # Принадлежность положительна только на звеньях с положительной вершиной и за крайними вершинами
+    pieces = [(x_coords[k], x_coords[k + 1]) for k in range(len(term_points) - 1)
+              if y_coords[k] > 0 or y_coords[k + 1] > 0]
+    if y_coords[0] > 0:
+        pieces.append((-np.inf, x_coords[0]))
+    if y_coords[-1] > 0:
+        pieces.append((x_coords[-1], np.inf))
+
+    if not pieces:
+        return None
+    return min(lower for lower, _ in pieces), max(upper for _, upper in pieces)
+
+
+class TermSupportIndex:
+    """
+    Индекс носителей термов одной входной переменной
+
+    Концы носителей (см. term_support) делят ось на участки, для каждого участка
+    хранится список термов, чьи носители его задевают. Участок значения находится
+    бинарным поиском, и принадлежность вычисляется только для этих термов.
+    """
+
+    def __init__(self, terms: dict):
+        self.terms = terms
+        supports = {term_name: support for term_name, term_points in terms.items()
+                    if (support := term_support(term_points)) is not None}
+
+        self.bounds = sorted({bound for support in supports.values() for bound in support if np.isfinite(bound)})
+        # Участок i - [bounds[i-1], bounds[i]), участки 0 и len(bounds) не ограничены
+        self.segment_terms = [[] for _ in range(len(self.bounds) + 1)]
+        for term_name, (lower, upper) in supports.items():
+            first_segment = bisect.bisect_right(self.bounds, lower)
+            last_segment = bisect.bisect_right(self.bounds, upper)
+            for segment in range(first_segment, last_segment + 1):
+                self.segment_terms[segment].append(term_name)
+
+    def memberships(self, input_value: float) -> dict[str, float]:
+        """Положительные принадлежности значения термам {терм: принадлежность}"""
+        fired_terms = {}
+        for term_name in self.segment_terms[bisect.bisect_right(self.bounds, input_value)]:
+            membership = calculate_trapezoidal_membership(self.terms, term_name, input_value)
+            if membership > 0:
+                fired_terms[term_name] = membership
+        return fired_terms
+
+
 def determine_output_range(terms_dict: dict) -> tuple[float, float]:
     """
     Определяет диапазон выходной переменной на основе всех терминов
@@ -105,6 +195,24 @@ def load_all_input_data(temperature_json: str,
     return temperature_terms, heat_level_terms, inference_rules
 
 
+def parse_inference_rule(rule) -> tuple[tuple[tuple[str, str], ...], str, str]:
+    """
+    Приводит правило к виду (условия, операция, выходной терм)
+
+    Правило задаётся парой [терм температуры, терм нагрева] или словарём с несколькими входами:
+    {"if": [[переменная, терм], ...], "operator": "and" | "or", "then": терм нагрева}
+    """
+    if isinstance(rule, dict):
+        operator = rule.get("operator", "and")
+        if operator not in RULE_OPERATORS:
+            raise ValueError(f"Неизвестная операция правила: {operator}")
+        if not rule["if"]:
+            raise ValueError("Правило без условий")
+        return tuple((variable, term) for variable, term in rule["if"]), operator, rule["then"]
+
+    return ((TEMPERATURE_VARIABLE, rule[0]),), "and", rule[1]
+
+
 def apply_fuzzy_inference_rules(temperature_terms: dict, 
                                 heat_level_terms: dict, 
                                 inference_rules: list, 
@@ -159,40 +267,539 @@ def defuzzify_centroid(aggregated_membership: list[float],
     return output_domain[0]
 
 
+def envelope_crossings(breakpoints: np.ndarray, start_values: np.ndarray,
+                       end_values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Точки смены правила на верхней огибающей линейных на интервалах функций
+
+    Параметры:
+    breakpoints: концы интервалов b_0 < ... < b_k
+    start_values, end_values: значения правил (строки) на концах интервалов (столбцы)
+
+    На интервале огибающая обходится слева направо: от правила с наибольшим значением
+    (при равенстве - с наибольшим наклоном) к ближайшему пересечению с более крутым
+    правилом. Наклон текущего правила растёт, поэтому шагов не больше смен правила
+    на огибающей, каждый шаг - O(числа правил).
+
+    Возвращает:
+    (точки пересечения, номера их интервалов)
+    """
+    slopes = end_values - start_values
+
+    # Если правило с наибольшим значением в начале интервала наибольшее и в конце, пересечений нет
+    top_rules = np.lexsort((slopes, start_values), axis=0)[-1]
+    interval_ids = np.arange(start_values.shape[1])
+    is_crossed = end_values[top_rules, interval_ids] < end_values.max(axis=0)
+
+    crossings, crossing_intervals = [], []
+    for interval in np.flatnonzero(is_crossed).tolist():
+        rule_starts, rule_slopes = start_values[:, interval], slopes[:, interval]
+        top_rule, position = int(top_rules[interval]), 0.0
+        while True:
+            # Доля интервала, на которой более крутое правило догоняет текущее
+            slope_gains = rule_slopes - rule_slopes[top_rule]
+            steeper = np.flatnonzero(slope_gains > 0)
+            meet_positions = (rule_starts[top_rule] - rule_starts[steeper]) / slope_gains[steeper]
+            ahead = meet_positions > position
+            if not ahead.any():
+                break
+            steeper, meet_positions = steeper[ahead], meet_positions[ahead]
+            # Ближайшее пересечение, при равенстве - самое крутое правило
+            next_idx = np.lexsort((-rule_slopes[steeper], meet_positions))[0]
+            position = meet_positions[next_idx]
+            if position >= 1:
+                break
+            crossings.append(breakpoints[interval] + position * (breakpoints[interval + 1] - breakpoints[interval]))
+            crossing_intervals.append(interval)
+            top_rule = int(steeper[next_idx])
+
+    return np.array(crossings, dtype=np.float64), np.array(crossing_intervals, dtype=np.intp)
+
+
+def aggregated_output_pieces(activated_rules: list, min_value: float,
+                             max_value: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Кусочно-линейное представление агрегированной принадлежности выхода
+
+    Параметры:
+    activated_rules: пары (степень активации, вершины выходного терма)
+    min_value, max_value: диапазон выходной переменной
+
+    Возвращает:
+    Изломы b_0 < ... < b_k, значения функции в изломах и значения на каждом
+    интервале (b_i, b_i+1): предел справа в b_i и предел слева в b_i+1
+    (на интервале функция линейна, в изломах возможны скачки)
+    """
+    def clip_points() -> list[float]:
+        # Вершины термов и точки, где принадлежность терма пересекает уровень отсечения
+        points = [min_value, max_value]
+        for rule_activation, term_points in activated_rules:
+            for (x_start, y_start), (x_end, y_end) in zip(term_points, term_points[1:]):
+                points.extend([x_start, x_end])
+                if x_start != x_end and min(y_start, y_end) < rule_activation < max(y_start, y_end):
+                    points.append(x_start + (rule_activation - y_start) * (x_end - x_start) / (y_end - y_start))
+        return points
+
+    def piece_values(breakpoints: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Значения отсечённых термов правил в третях интервалов, продолженные линейно к концам
+        # (так получаются односторонние пределы и при вертикальных рёбрах трапеций)
+        widths = np.diff(breakpoints)
+        first_third = breakpoints[:-1] + widths / 3
+        second_third = breakpoints[:-1] + 2 * widths / 3
+        first_values = np.array([np.minimum(rule_activation, trapezoidal_membership_array(term_points, first_third))
+                                 for rule_activation, term_points in activated_rules])
+        second_values = np.array([np.minimum(rule_activation, trapezoidal_membership_array(term_points, second_third))
+                                  for rule_activation, term_points in activated_rules])
+        return 2 * first_values - second_values, 2 * second_values - first_values
+
+    breakpoints = np.unique(np.clip(clip_points(), min_value, max_value).astype(np.float64))
+    if len(breakpoints) < 2 or not activated_rules:
+        zeros = np.zeros(max(0, len(breakpoints) - 1))
+        return breakpoints, np.zeros(len(breakpoints)), zeros, zeros.copy()
+
+    # Пересечения верхней огибающей отсечённых термов внутри интервалов
+    start_values, end_values = piece_values(breakpoints)
+    crossings, interval = envelope_crossings(breakpoints, start_values, end_values)
+    # Пересечение в пределах погрешности от конца интервала - это сам конец (там возможен скачок)
+    end_gaps = np.minimum(crossings - breakpoints[interval], breakpoints[interval + 1] - crossings)
+    breakpoints = np.unique(np.concatenate([breakpoints, crossings[end_gaps > 1e-9 * (max_value - min_value)]]))
+
+    # Между изломами максимум линейных функций без пересечений - одна из них
+    start_values, end_values = piece_values(breakpoints)
+    point_values = np.max([np.minimum(rule_activation, trapezoidal_membership_array(term_points, breakpoints))
+                           for rule_activation, term_points in activated_rules], axis=0)
+    return breakpoints, point_values, start_values.max(axis=0), end_values.max(axis=0)
+
+
+def _maximum_set(pieces: tuple) -> tuple[np.ndarray, np.ndarray]:
+    # Множество максимума: интервалы-плато и отдельные точки, где достигается высота функции
+    breakpoints, point_values, start_values, end_values = pieces
+    height = max(point_values.max(), start_values.max(), end_values.max())
+    at_start = np.isclose(start_values, height, rtol=1e-12, atol=0)
+    at_end = np.isclose(end_values, height, rtol=1e-12, atol=0)
+    plateaus = at_start & at_end
+    points = np.concatenate([breakpoints[np.isclose(point_values, height, rtol=1e-12, atol=0)],
+                             breakpoints[:-1][at_start & ~plateaus], breakpoints[1:][at_end & ~plateaus]])
+    return plateaus, np.unique(points)
+
+
+def _defuzzify_maximum(position: str):
+    def defuzzify(pieces: tuple, min_value: float, max_value: float) -> float:
+        breakpoints, point_values, start_values, end_values = pieces
+        if max(point_values.max(initial=0), start_values.max(initial=0), end_values.max(initial=0)) <= 0:
+            return (min_value + max_value) / 2  # Ни одно правило не сработало
+
+        plateaus, points = _maximum_set(pieces)
+        plateau_starts, plateau_ends = breakpoints[:-1][plateaus], breakpoints[1:][plateaus]
+
+        if position == "first":
+            return float(min(np.concatenate([plateau_starts, points])))
+        if position == "last":
+            return float(max(np.concatenate([plateau_ends, points])))
+        # Среднее максимума: центр плато, если у множества максимума есть длина
+        if len(plateau_starts):
+            lengths = plateau_ends - plateau_starts
+            return float(np.sum(lengths * (plateau_starts + plateau_ends) / 2) / np.sum(lengths))
+        return float(points.mean())
+
+    return defuzzify
+
+
+def defuzzify_exact_centroid(pieces: tuple, min_value: float, max_value: float) -> float:
+    """Центр тяжести кусочно-линейной принадлежности (интегралы по трапециям)"""
+    breakpoints, _, start_values, end_values = pieces
+    widths = np.diff(breakpoints)
+    area = np.sum(widths * (start_values + end_values) / 2)
+    if area <= 0:
+        return (min_value + max_value) / 2  # Ни одно правило не сработало
+
+    moment = np.sum(widths * (breakpoints[:-1] * (2 * start_values + end_values)
+                              + breakpoints[1:] * (start_values + 2 * end_values)) / 6)
+    return float(moment / area)
+
+
+# Точные методы дефаззификации по изломам агрегированной принадлежности
+DEFUZZIFICATION_METHODS = {
+    "first_of_maximum": _defuzzify_maximum("first"),
+    "mean_of_maximum": _defuzzify_maximum("mean"),
+    "last_of_maximum": _defuzzify_maximum("last"),
+    "centroid": defuzzify_exact_centroid,
+}
+
+
+class FuzzyController:
+    """
+    Скомпилированный нечёткий регулятор
+
+    Термы и правила разбираются один раз, принадлежности выходных термов
+    на дискретном диапазоне хранятся массивами NumPy. Вывод для одной
+    температуры - вычисление активаций правил и несколько векторных min/max,
+    результат совпадает с main.
+
+    Кроме температуры правила могут использовать другие входные переменные
+    (input_terms_json: {переменная: JSON термов под ключом переменной}),
+    входные значения тогда передаются словарём {переменная: значение}.
+    Для каждой переменной строится TermSupportIndex, и при выводе
+    просматриваются только правила со сработавшими термами.
+    """
+
+    def __init__(self, temperature_json: str, heat_level_json: str, mapping_json: str,
+                 num_points: int = 1000, input_terms_json: dict[str, str] = None):
+        self.temperature_terms, self.heat_level_terms, self.inference_rules = load_all_input_data(
+            temperature_json, heat_level_json, mapping_json
+        )
+        self.input_terms = {TEMPERATURE_VARIABLE: self.temperature_terms}
+        for variable, terms_json in (input_terms_json or {}).items():
+            self.input_terms[variable] = parse_fuzzy_terms_json(terms_json, variable)
+        self.output_min, self.output_max = determine_output_range(self.heat_level_terms)
+        self.output_domain = np.array(generate_discrete_domain(self.output_min, self.output_max, num_points))
+
+        # Принадлежности выходных термов на дискретном диапазоне
+        self.output_memberships = {
+            term_name: trapezoidal_membership_array(term_points, self.output_domain)
+            for term_name, term_points in self.heat_level_terms.items()
+        }
+
+        # Правила с неизвестным выходным термом не меняют агрегированную принадлежность
+        self.rules = [
+            (conditions, operator, heat_level_term, self.output_memberships[heat_level_term])
+            for conditions, operator, heat_level_term in map(parse_inference_rule, self.inference_rules)
+            if heat_level_term in self.output_memberships
+        ]
+        self.single_input = all(len(conditions) == 1 and conditions[0][0] == TEMPERATURE_VARIABLE
+                                for conditions, *_ in self.rules)
+
+        # Индексы носителей термов и правила по условиям (переменная, терм)
+        self.support_indexes = {variable: TermSupportIndex(terms) for variable, terms in self.input_terms.items()}
+        self.rules_by_condition = {}
+        for rule_idx, (conditions, *_) in enumerate(self.rules):
+            for condition in set(conditions):
+                self.rules_by_condition.setdefault(condition, []).append(rule_idx)
+
+    def fire_rules(self, current_temperature) -> list[tuple[float, str, np.ndarray]]:
+        """
+        Сработавшие правила: (степень активации > 0, выходной терм, принадлежности выходного терма)
+
+        Параметры:
+        current_temperature: температура или словарь {переменная: значение}
+        """
+        input_values = (current_temperature if isinstance(current_temperature, dict)
+                        else {TEMPERATURE_VARIABLE: current_temperature})
+
+        fired_conditions = {}
+        for variable, input_value in input_values.items():
+            if variable in self.support_indexes:
+                for term_name, membership in self.support_indexes[variable].memberships(input_value).items():
+                    fired_conditions[(variable, term_name)] = membership
+
+        # Правила хотя бы с одним сработавшим условием; несработавшее условие имеет степень 0
+        candidate_rules = dict.fromkeys(rule_idx for condition in fired_conditions
+                                        for rule_idx in self.rules_by_condition.get(condition, ()))
+        fired_rules = []
+        for rule_idx in candidate_rules:
+            conditions, operator, heat_level_term, output_membership = self.rules[rule_idx]
+            rule_activation = RULE_OPERATORS[operator](fired_conditions.get(condition, 0.0)
+                                                       for condition in conditions)
+            if rule_activation > 0:
+                fired_rules.append((rule_activation, heat_level_term, output_membership))
+
+        return fired_rules
+
+    def aggregate(self, current_temperature) -> np.ndarray:
+        """Агрегированная принадлежность выхода (аналог apply_fuzzy_inference_rules)"""
+        aggregated_membership = np.zeros(len(self.output_domain))
+
+        for rule_activation, _, output_membership in self.fire_rules(current_temperature):
+            np.maximum(aggregated_membership, np.minimum(rule_activation, output_membership),
+                       out=aggregated_membership)
+
+        return aggregated_membership
+
+    def infer(self, current_temperature, method: str = "grid") -> float:
+        """
+        Оптимальное значение управления для текущей температуры
+
+        Параметры:
+        current_temperature: температура или словарь {переменная: значение}
+        method: "grid" - первый максимум на дискретном диапазоне (как в main),
+                либо точный метод из DEFUZZIFICATION_METHODS (см. infer_exact)
+        """
+        if method != "grid":
+            return self.infer_exact(current_temperature, method)
+
+        aggregated_membership = self.aggregate(current_temperature)
+        max_membership = aggregated_membership.max()
+
+        # Если ни одно правило не сработало
+        if max_membership == 0:
+            return (self.output_min + self.output_max) / 2
+
+        # Первое значение с максимальной принадлежностью
+        return float(self.output_domain[np.argmax(aggregated_membership == max_membership)])
+
+    def infer_exact(self, current_temperature, method: str = "centroid") -> float:
+        """
+        Точная дефаззификация без дискретного диапазона
+
+        Агрегированная принадлежность выхода кусочно-линейна, её изломы находятся
+        по вершинам выходных термов, уровням отсечения и пересечениям правил
+        (см. aggregated_output_pieces).
+
+        Параметры:
+        method: один из DEFUZZIFICATION_METHODS
+        """
+        if method not in DEFUZZIFICATION_METHODS:
+            raise ValueError(f"Неизвестный метод дефаззификации: {method}")
+
+        activated_rules = [(rule_activation, self.heat_level_terms[heat_level_term])
+                           for rule_activation, heat_level_term, _ in self.fire_rules(current_temperature)]
+
+        pieces = aggregated_output_pieces(activated_rules, self.output_min, self.output_max)
+        return DEFUZZIFICATION_METHODS[method](pieces, self.output_min, self.output_max)
+
+    def infer_batch(self, temperatures, memory_budget: int = 256 * 2**20) -> np.ndarray:
+        """
+        Векторный вывод для массива температур
+
+        Активации всех правил считаются сразу для всего массива, агрегированная
+        принадлежность (N x размер диапазона) строится блоками строк.
+
+        Параметры:
+        temperatures: массив температур или словарь {переменная: массив значений}
+        memory_budget: ограничение памяти на промежуточные массивы, байт
+
+        Возвращает:
+        Массив значений управления той же формы, поэлементно равный infer
+        """
+        if not isinstance(temperatures, dict):
+            temperatures = {TEMPERATURE_VARIABLE: temperatures}
+        variables = list(temperatures)
+        input_arrays = np.broadcast_arrays(*(np.asarray(temperatures[variable], dtype=np.float64)
+                                             for variable in variables))
+        output_shape = input_arrays[0].shape
+        flat_inputs = {variable: input_array.ravel() for variable, input_array in zip(variables, input_arrays)}
+        num_inputs = int(np.prod(output_shape))
+        control_values = np.empty(num_inputs)
+
+        # Активации правил; несработавшие правила (активация <= 0) не влияют на максимум
+        activations = []
+        for conditions, operator, _, output_membership in self.rules:
+            condition_degrees = [
+                trapezoidal_membership_array(self.input_terms[variable][term_name], flat_inputs[variable])
+                if variable in flat_inputs and term_name in self.input_terms.get(variable, {})
+                else np.zeros(num_inputs)
+                for variable, term_name in conditions
+            ]
+            rule_activation = (np.minimum if operator == "and" else np.maximum).reduce(condition_degrees)
+            activations.append((np.where(rule_activation > 0, rule_activation, -np.inf), output_membership))
+
+        # Агрегированный блок и временный массив min
+        chunk_size = max(1, memory_budget // max(1, 16 * len(self.output_domain)))
+
+        for start in range(0, num_inputs, chunk_size):
+            stop = min(start + chunk_size, num_inputs)
+            aggregated_membership = np.zeros((stop - start, len(self.output_domain)))
+            for rule_activation, output_membership in activations:
+                np.maximum(aggregated_membership,
+                           np.minimum(rule_activation[start:stop, np.newaxis], output_membership[np.newaxis, :]),
+                           out=aggregated_membership)
+
+            max_membership = aggregated_membership.max(axis=1)
+            first_max = np.argmax(aggregated_membership == max_membership[:, np.newaxis], axis=1)
+            control_values[start:stop] = np.where(max_membership == 0,
+                                                  (self.output_min + self.output_max) / 2,
+                                                  self.output_domain[first_max])
+
+        return control_values.reshape(output_shape)
+
+    def critical_temperatures(self) -> np.ndarray:
+        """
+        Точки излома поверхности управления: вершины входных термов правил
+        и точки пересечения их функций принадлежности (смена максимальной активации)
+
+        Поверхность определена только для правил с одним входом - температурой.
+        """
+        if not self.single_input:
+            raise ValueError("Поверхность управления строится только для правил с одним входом (температура)")
+
+        rule_terms = sorted({conditions[0][1] for conditions, *_ in self.rules
+                             if conditions[0][1] in self.temperature_terms})
+        vertices = np.unique([x_coord for term_name in rule_terms
+                              for x_coord, _ in self.temperature_terms[term_name]]).astype(np.float64)
+        if len(rule_terms) < 2 or len(vertices) < 2:
+            return vertices
+
+        # Между соседними вершинами все принадлежности линейны, пересечения - корни разностей
+        memberships = np.array([trapezoidal_membership_array(self.temperature_terms[term_name], vertices)
+                                for term_name in rule_terms])
+        differences = memberships[:, np.newaxis, :] - memberships[np.newaxis, :, :]
+        left, right = differences[:, :, :-1], differences[:, :, 1:]
+        first, second, interval = np.nonzero(np.triu(np.ones((len(rule_terms),) * 2, dtype=bool), 1)[:, :, np.newaxis]
+                                             & (left * right < 0))
+        left, right = left[first, second, interval], right[first, second, interval]
+        crossings = vertices[interval] + (vertices[interval + 1] - vertices[interval]) * left / (left - right)
+
+        return np.unique(np.concatenate([vertices, crossings]))
+
+    def build_control_surface(self, tolerance: float = None, min_step: float = None) -> "ControlSurfaceTable":
+        """
+        Табулирует зависимость управления от температуры
+
+        Начальная сетка - точки излома (critical_temperatures). Интервал делится на восемь частей,
+        пока линейная интерполяция по его концам отличается от infer в точках деления
+        больше чем на tolerance, либо пока его ширина не станет меньше min_step
+        (так локализуются скачки первого максимума). Вне сетки поверхность постоянна.
+
+        Параметры:
+        tolerance: допустимая ошибка интерполяции (по умолчанию два шага выходного диапазона:
+                   infer - ступенчатая функция с шагом дискретного диапазона, и меньшая ошибка
+                   достижима только ценой узла на каждой ступени)
+        min_step: наименьшая ширина интервала (по умолчанию 1e-9 ширины входного диапазона)
+        """
+        sample_points = self.critical_temperatures()
+        if len(sample_points) == 0:
+            sample_points = np.zeros(1)
+        if tolerance is None:
+            tolerance = 2 * (self.output_max - self.output_min) / max(1, len(self.output_domain) - 1)
+        if min_step is None:
+            min_step = 1e-9 * max(1.0, sample_points[-1] - sample_points[0])
+
+        sample_values = self.infer_batch(sample_points)
+        pending = np.flatnonzero(np.diff(sample_points) > min_step)
+
+        while len(pending):
+            interval_start, interval_end = sample_points[pending], sample_points[pending + 1]
+            start_values, end_values = sample_values[pending], sample_values[pending + 1]
+            fractions = np.arange(1, 8) / 8
+
+            inner_points = interval_start[:, np.newaxis] + (interval_end - interval_start)[:, np.newaxis] * fractions
+            inner_values = self.infer_batch(inner_points)
+            interpolated = start_values[:, np.newaxis] + (end_values - start_values)[:, np.newaxis] * fractions
+            refine = np.abs(inner_values - interpolated).max(axis=1) > tolerance
+
+            if not refine.any():
+                break
+            known_count = len(sample_points)
+            sample_points = np.concatenate([sample_points, inner_points[refine].ravel()])
+            sample_values = np.concatenate([sample_values, inner_values[refine].ravel()])
+            order = np.argsort(sample_points, kind='stable')
+            sample_points, sample_values = sample_points[order], sample_values[order]
+
+            # Проверке подлежат только части разделённых интервалов (смежные с новыми точками)
+            is_new = order >= known_count
+            pending = np.flatnonzero((is_new[:-1] | is_new[1:]) & (np.diff(sample_points) > min_step))
+
+        return ControlSurfaceTable(sample_points, sample_values)
+
+
+class ControlSurfaceTable:
+    """
+    Таблица поверхности управления: узлы температуры и значения управления в них
+
+    Запрос - бинарный поиск интервала и линейная интерполяция (np.interp),
+    вне узлов значение постоянно и равно крайнему.
+    """
+
+    def __init__(self, temperatures: np.ndarray, control_values: np.ndarray):
+        self.temperatures = np.asarray(temperatures, dtype=np.float64)
+        self.control_values = np.asarray(control_values, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.temperatures)
+
+    def lookup(self, temperatures):
+        """Значение управления для температуры или массива температур"""
+        control_values = np.interp(temperatures, self.temperatures, self.control_values)
+        return float(control_values) if np.ndim(control_values) == 0 else control_values
+
+    def save(self, path: str) -> None:
+        """Сохраняет таблицу в файл .npz"""
+        np.savez(path, temperatures=self.temperatures, control_values=self.control_values)
+
+    @classmethod
+    def load(cls, path: str) -> "ControlSurfaceTable":
+        """Загружает таблицу, сохранённую save()"""
+        with np.load(path) as saved:
+            return cls(saved["temperatures"], saved["control_values"])
+
+
+@lru_cache(maxsize=32)
+def test1():
+    """
+    Проверяет aggregated_output_pieces и точные методы дефаззификации перебором
+    на мелкой сетке выходного диапазона
+
+    Между изломами кусочно-линейное представление должно совпадать с максимумом
+    отсечённых термов, иначе пропущено пересечение правил (см. envelope_crossings).
+    """
+    min_value, max_value = 0.0, 26.0
+    rule_sets = [
+        [(0.7, [[0, 0], [4, 1], [8, 1], [12, 0]]), (0.4, [[6, 0], [10, 1], [14, 1], [20, 0]])],
+        # Много пересекающихся правил с разными уровнями отсечения
+        [(0.25 * (i % 4) + 0.15, [[i, 0], [i + 3, 1], [i + 4, 1], [i + 7, 0]]) for i in range(0, 19, 2)],
+        # Вертикальные рёбра, плечи и совпадающие правила
+        [(0.6, [[0, 1], [0, 1], [4, 1], [9, 0]]), (0.8, [[5, 0], [5, 1], [8, 1], [8, 0]]),
+         (0.5, [[7, 0], [15, 1], [20, 1], [20, 1]]), (0.5, [[7, 0], [15, 1], [20, 1], [20, 1]])],
+        [],
+    ]
+    grid = np.linspace(min_value, max_value, 200001)
+    step = grid[1] - grid[0]
+
+    for activated_rules in rule_sets:
+        pieces = aggregated_output_pieces(activated_rules, min_value, max_value)
+        breakpoints, _, start_values, end_values = pieces
+        expected = np.max([np.minimum(rule_activation, trapezoidal_membership_array(term_points, grid))
+                           for rule_activation, term_points in activated_rules] + [np.zeros(len(grid))], axis=0)
+
+        interval = np.clip(np.searchsorted(breakpoints, grid, side='right') - 1, 0, len(breakpoints) - 2)
+        inside = (grid > breakpoints[interval]) & (grid < breakpoints[interval + 1])
+        shares = (grid - breakpoints[interval]) / (breakpoints[interval + 1] - breakpoints[interval])
+        values = start_values[interval] + shares * (end_values[interval] - start_values[interval])
+        assert np.allclose(values[inside], expected[inside], rtol=0, atol=1e-9), "Изломы огибающей найдены неверно!"
+
+        if expected.max() == 0:
+            for method in DEFUZZIFICATION_METHODS.values():
+                assert method(pieces, min_value, max_value) == (min_value + max_value) / 2
+            continue
+
+        maximum = grid[expected >= expected.max() - 1e-12]
+        expected_results = {
+            "first_of_maximum": maximum[0], "mean_of_maximum": maximum.mean(), "last_of_maximum": maximum[-1],
+            "centroid": np.sum(expected * grid) / np.sum(expected),
+        }
+        for method_name, expected_result in expected_results.items():
+            result = DEFUZZIFICATION_METHODS[method_name](pieces, min_value, max_value)
+            assert abs(result - expected_result) < 2 * step, f"Метод {method_name} расходится с перебором!"
+
+
+def compile_controller(temperature_json: str, heat_level_json: str, mapping_json: str) -> FuzzyController:
+    """Регулятор для набора JSON-описаний (кэшируется между вызовами)"""
+    return FuzzyController(temperature_json, heat_level_json, mapping_json)
+
+
 def main(temperature_json: str, 
          heat_level_json: str, 
          mapping_json: str, 
-         current_temperature: float) -> float:
+         current_temperature: float,
+         method: str = "grid") -> float:
 
     #Основная функция нечёткого вывода
+    #method: "grid" (первый максимум на дискретном диапазоне) или точный метод из DEFUZZIFICATION_METHODS
 
-    # Загружаем и парсим входные данные
-    temperature_terms, heat_level_terms, inference_rules = load_all_input_data(
-        temperature_json, heat_level_json, mapping_json
-    )
-    
-    # Определяем диапазон выходной переменной
-    output_min, output_max = determine_output_range(heat_level_terms)
-    
-    # Генерируем дискретный диапазон для выходной переменной
-    output_domain_values = generate_discrete_domain(output_min, output_max)
-    
-    # Применяем правила нечёткого вывода
-    aggregated_membership_values = apply_fuzzy_inference_rules(
-        temperature_terms, heat_level_terms, inference_rules, 
-        current_temperature, output_domain_values
-    )
+    # Разбор входных данных и предвычисление выходных принадлежностей выполняются один раз
+    controller = compile_controller(temperature_json, heat_level_json, mapping_json)
     
-    # Выполняем дефаззификацию
-    optimal_control_value = defuzzify_centroid(
-        aggregated_membership_values, output_domain_values, 
-        output_min, output_max
-    )
-    
-    return optimal_control_value
+    return controller.infer(current_temperature, method)
 
 
 if __name__ == "__main__":
+    try:
+        test1()
+    except AssertionError:
+        print("Тест не пройден")
+    else:
+        print("Тест пройден успешно!")
+
     temperature_json_content = read_json_file("task4/temperature.json")
     heat_level_json_content = read_json_file("task4/heat_lvl.json")
     mapping_json_content = read_json_file("task4/mapping.json")